@@ -0,0 +1,304 @@
+import json
+import time
+import zipfile
+from datetime import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+import forecast
+from history import INDEXED_FIELDS, NAME_FIELDS
+
+# Archives are .npz files: every column is written in chunks as
+# `<column>.<chunk>.npy`, string columns as int32 codes into `dict_<column>`.
+FORMAT_VERSION = 1
+ENCODED_COLUMNS = ('island', 'map', 'boss', 'rank')
+FLAG_COLUMNS = ('red_dungeon', 'double_dungeon')
+CHUNK_SIZE = 65536
+
+
+class ArchiveError(Exception):
+    pass
+
+
+def require_numpy():
+    if np is None:
+        raise ArchiveError("NumPy is required for history archives.")
+
+
+def _write_array(zf, name, array):
+    with zf.open(f"{name}.npy", 'w', force_zip64=True) as fh:
+        np.lib.format.write_array(fh, array, allow_pickle=False)
+
+
+def _encode_chunk(records, dictionaries):
+    columns = {
+        'timestamp':
+        np.fromiter((record['timestamp'].timestamp() for record in records),
+                    dtype=np.float64,
+                    count=len(records)),
+        'message_id':
+        np.fromiter((record.get('message_id') or 0 for record in records),
+                    dtype=np.int64,
+                    count=len(records)),
+    }
+    for column in ENCODED_COLUMNS:
+        mapping = dictionaries[column]
+        columns[column] = np.fromiter(
+            (mapping.setdefault(record[column], len(mapping))
+             for record in records),
+            dtype=np.int32,
+            count=len(records))
+    for column in FLAG_COLUMNS:
+        columns[column] = np.fromiter(
+            (record[column].lower() == 'yes' for record in records),
+            dtype=np.bool_,
+            count=len(records))
+    return columns
+
+
+def export_history(records, path, chunk_size=CHUNK_SIZE):
+    """Stream `records` into a chunked, dictionary-encoded .npz archive."""
+    require_numpy()
+    dictionaries = {column: {} for column in ENCODED_COLUMNS}
+    chunks = 0
+    with zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED) as zf:
+        for start in range(0, len(records), chunk_size):
+            columns = _encode_chunk(records[start:start + chunk_size],
+                                    dictionaries)
+            for name, array in columns.items():
+                _write_array(zf, f"{name}.{chunks:05d}", array)
+            chunks += 1
+        for column, mapping in dictionaries.items():
+            _write_array(zf, f"dict_{column}",
+                         np.array(list(mapping), dtype=np.str_))
+        zf.writestr(
+            'meta.json',
+            json.dumps({
+                'version': FORMAT_VERSION,
+                'rows': len(records),
+                'chunks': chunks,
+                'exported_at': time.time(),
+            }))
+    return len(records)
+
+
+def encode_history(records):
+    """Encode `records` into whole columns, as `load_history` returns them."""
+    require_numpy()
+    dictionaries = {column: {} for column in ENCODED_COLUMNS}
+    columns = _encode_chunk(records, dictionaries)
+    return columns, {
+        column: np.array(list(mapping), dtype=np.str_)
+        for column, mapping in dictionaries.items()
+    }
+
+
+def load_history(path):
+    """Read an archive back into whole columns.
+
+    String columns stay encoded; their dictionaries are returned alongside.
+    """
+    require_numpy()
+    with zipfile.ZipFile(path) as zf:
+        try:
+            meta = json.loads(zf.read('meta.json'))
+        except KeyError:
+            raise ArchiveError("Not a history archive (missing meta.json).")
+    if meta.get('version') != FORMAT_VERSION:
+        raise ArchiveError(
+            f"Unsupported archive version {meta.get('version')}.")
+
+    with np.load(path, allow_pickle=False) as data:
+        dictionaries = {
+            column: data[f"dict_{column}"]
+            for column in ENCODED_COLUMNS
+        }
+        columns = {}
+        for name in ('timestamp', 'message_id') + ENCODED_COLUMNS + FLAG_COLUMNS:
+            parts = [
+                data[f"{name}.{chunk:05d}"] for chunk in range(meta['chunks'])
+            ]
+            columns[name] = np.concatenate(parts) if parts else np.empty(0)
+    return columns, dictionaries
+
+
+def import_history(path, state):
+    """Bulk-load an archive into a guild state and rebuild its counters.
+
+    Rows whose message ID is already in the state's history are skipped.
+    Returns the number of rows imported. Runs both halves of the import
+    back to back, so only use it on a state nothing else is touching yet;
+    for a live guild, run `decode_history` in a thread and `apply_import`
+    on the event loop.
+    """
+    columns, dictionaries = load_history(path)
+    return import_columns(columns, dictionaries, state)
+
+
+def import_columns(columns, dictionaries, state):
+    """Merge archive columns into a guild state; see import_history."""
+    batch = decode_columns(columns, dictionaries, state.history)
+    return apply_import(batch, state) if batch is not None else 0
+
+
+def decode_history(path, existing=()):
+    """Read and decode an archive without touching any guild state."""
+    columns, dictionaries = load_history(path)
+    return decode_columns(columns, dictionaries, existing)
+
+
+def decode_columns(columns, dictionaries, existing=()):
+    """Dedupe, sort and decode archive columns into history records.
+
+    `existing` is the history (or a copy of it) whose message IDs are
+    skipped. Safe to run in a worker thread; returns a batch for
+    `apply_import`, or None when there is nothing new.
+    """
+    existing = list(existing)
+    existing_ids = np.fromiter(
+        (record.get('message_id') or 0 for record in existing),
+        dtype=np.int64,
+        count=len(existing))
+    keep = ~np.isin(columns['message_id'], existing_ids[existing_ids != 0])
+    if keep.all() and not (np.diff(columns['timestamp']) < 0).any():
+        # Already new and in order (a snapshot is): decode from the given
+        # arrays as they are, which may be views into a mapped file.
+        columns = dict(columns)
+    else:
+        order = np.argsort(columns['timestamp'][keep], kind='stable')
+        columns = {
+            name: values[keep][order]
+            for name, values in columns.items()
+        }
+    rows = len(columns['timestamp'])
+    if not rows:
+        return None
+
+    # Rank is normalised before counting so 's' and 'S' share a bucket.
+    dictionaries = dict(dictionaries)
+    dictionaries['rank'] = np.char.upper(dictionaries['rank'])
+    decoded = {
+        column: dictionaries[column][columns[column]].tolist()
+        for column in ENCODED_COLUMNS
+    }
+    flags = {
+        column: np.where(columns[column], 'Yes', 'No').tolist()
+        for column in FLAG_COLUMNS
+    }
+    timestamps = columns['timestamp'].tolist()
+    message_ids = columns['message_id'].tolist()
+    records = [{
+        'island': decoded['island'][i],
+        'map': decoded['map'][i],
+        'boss': decoded['boss'][i],
+        'rank': decoded['rank'][i],
+        'red_dungeon': flags['red_dungeon'][i],
+        'double_dungeon': flags['double_dungeon'][i],
+        'timestamp': datetime.fromtimestamp(timestamps[i]),
+        'message_id': message_ids[i] or None,
+    } for i in range(rows)]
+
+    # Group row offsets per code once; this drives both the history
+    # indexes and the lifetime counters.
+    positions = {}
+    counts = {}
+    for field in INDEXED_FIELDS:
+        codes = columns[field]
+        order = np.argsort(codes, kind='stable')
+        unique, starts, sizes = np.unique(codes[order],
+                                          return_index=True,
+                                          return_counts=True)
+        values = dictionaries[field][unique].tolist()
+        positions[field] = {}
+        counts[field] = {}
+        for value, start, size in zip(values, starts, sizes):
+            offsets = order[start:start + size]
+            if value in positions[field]:
+                offsets = np.sort(
+                    np.concatenate([positions[field][value], offsets]))
+            positions[field][value] = offsets
+            counts[field][value] = counts[field].get(value, 0) + int(size)
+
+    # Forecast histograms straight from the code columns; the timestamps
+    # are already sorted, so this is one grouped pass per kind.
+    gaps = {}
+    for kind in forecast.KINDS:
+        keys, key_ids = np.unique(dictionaries[kind], return_inverse=True)
+        gaps.update(
+            forecast.gap_histograms(kind, keys.tolist(),
+                                    key_ids.ravel()[columns[kind]],
+                                    columns['timestamp']))
+
+    names = {}
+    for field in NAME_FIELDS:
+        unique, sizes = np.unique(columns[field], return_counts=True)
+        names[field] = [(value, size) for value, size in zip(
+            dictionaries[field][unique].tolist(), sizes.tolist())
+                        if value != 'Unknown']
+
+    return {
+        'columns': columns,
+        'dictionaries': dictionaries,
+        'records': records,
+        'timestamps': timestamps,
+        'positions': positions,
+        'counts': counts,
+        'names': names,
+        'gaps': gaps,
+        'seen': len(existing),
+    }
+
+
+def apply_import(batch, state):
+    """Fold a `decode_columns` batch into a guild state.
+
+    Call on the event loop, where live spawns are recorded too. Rows for
+    messages that were recorded live while the batch was decoded are
+    dropped first.
+    """
+    history = state.history
+    late_ids = {
+        record.get('message_id')
+        for record in history[batch['seen']:]
+    } - {None}
+    if late_ids and np.isin(batch['columns']['message_id'],
+                            list(late_ids)).any():
+        batch = decode_columns(batch['columns'], batch['dictionaries'],
+                               history[batch['seen']:])
+        if batch is None:
+            return 0
+    records = batch['records']
+    timestamps = batch['timestamps']
+    counts = batch['counts']
+    rows = len(records)
+
+    history.merge_indexed(records, batch['positions'])
+
+    stats = state.stats
+    stats['total_spawns'] += rows
+    for rank, count in counts['rank'].items():
+        stats['rank_counts'][rank] = stats['rank_counts'].get(rank, 0) + count
+    for island, count in counts['island'].items():
+        stats['island_counts'][island] = stats['island_counts'].get(
+            island, 0) + count
+
+    stats_engine = state.stats_engine
+    cutoff = stats_engine.clock() - 24 * 3600
+    first_recent = int(
+        np.searchsorted(batch['columns']['timestamp'], cutoff))
+    stats_engine.merge(rows,
+                       counts,
+                       earliest=timestamps[0],
+                       recent=((records[i], timestamps[i])
+                               for i in range(first_recent, rows)))
+
+    for field, names in batch['names'].items():
+        trie = state.names[field]
+        for value, size in names:
+            trie.add(value, size)
+
+    state.forecaster.merge(batch['gaps'])
+    return rows
@@ -1,234 +1,239 @@
- BAD_WORDS = [
-            "fuck",
-            "fuk",
-            "fck",
-            "f***",
-            "f*ck",
-            "f.u.c.k",
-            "fu",
-            "f u",
-            "f.u",
-            "fawk",
-            "fak",
-            "phuck",
-            "phuk",
-            "shit",
-            "sh1t",
-            "sh*t",
-            "s.h.i.t",
-            "sh!t",
-            "shiiit",
-            "bitch",
-            "b!tch",
-            "b1tch",
-            "b*tch",
-            "b i t c h",
-            "biatch",
-            "pussy",
-            "pussi",
-            "p*ssy",
-            "p.u.s.s.y",
-            "pussee",
-            "dick",
-            "d1ck",
-            "d*ck",
-            "dik",
-            "d.i.c.k",
-            "dyck",
-            "cock",
-            "c0ck",
-            "cawk",
-            "nega"
-            "fvck"
-            "kawk",
-            "cunt",
-            "cu*t",
-            "cnt",
-            "c.u.n.t",
-            "slut",
-            "s1ut",
-            "s.l.u.t",
-            "sloot",
-            "whore",
-            "wh0re",
-            "w.h.o.r.e",
-            "hoe",
-            "h0e",
-            "h03",
-            "ass",
-            "a55",
-            "azz",
-            "arse",
-            "asshole",
-            "a**hole",
-            "a**",
-            "arsehole",
-
-            "nigga",
-            "nigger",
-            "niga",
-            "n1gga",
-            "ni99a",
-            "ni**a",
-            "ni**er",
-            "niga",
-            "negro",
-            "negga",
-            "negra",
-            "nigguh",
-            "neega",
-            "neega",
-            "negr",
-            "negr0",
-            "n3gro",
-            "n1gr",
-            "chink",
-            "chingchong",
-            "ching chong",
-            "gook",
-            "zipperhead",
-            "slanty",
-            "slant eye",
-            "chino",
-            "yellowman",
-            "rice eater",
-            "paki",
-            "pak1",
-            "pak1stani",
-            "raghead",
-            "towelhead",
-            "camel jockey",
-            "sandnigger",
-            "gypsy",
-            "gyppo",
-            "gippo",
-
-            "fag",
-            "faggot",
-            "fa**ot",
-            "f@g",
-            "f4g",
-            "fgt",
-            "fagot",
-            "dyke",
-            "d1ke",
-            "d*ke",
-            "d.y.k.e",
-            "tranny",
-            "trannie",
-            "transvestite",
-            "shemale",
-            "he-she",
-            "ladyboy",
-            "crossdresser",
-            "homo",
-            "hom0",
-            "queer",
-
-            "retard",
-            "retarded",
-            "r3tard",
-            "r*tard",
-            "r3t4rd",
-            "spaz",
-            "spastic",
-            "autist",
-            "lamebrain",
-            "moron",
-            "imbecile",
-
-            "bastard",
-            "twat",
-            "jerk",
-            "loser",
-            "scumbag",
-            "dipshit",
-            "douche",
-            "douchebag",
-            "fatass",
-            "fat ass",
-            "fatso",
-            "obese",
-            "fattie",
-            "blubber",
-
-            "kys",
-            "k y s",
-            "kill yourself",
-            "go die",
-            "just die",
-            "end yourself",
-            "unalive yourself",
-            "neck yourself",
-            "commit die",
-
-            "damn",
-            "dammit",
-            "hell",
-            "d@mn",
-            "d@mmit",
-            "bastard",
-            "bloody",
-            "bugger",
-            "bollocks",
-            "wanker",
-            "sod off",
-            "tosser",
-            "lmfao",
-            "lmao",
-            "rekt",
-            "ez",
-            "git gud",
-            "gg ez",
-            "clapped",
-
-            "cracker",
-            "honkey",
-            "hillbilly",
-            "redneck",
-            "yankee",
-            "white trash",
-            "ape",
-            "monkey",
-            "coon",
-            "savage",
-            "caveman",
-            "uncivilized",
-
-            "nlgga",
-            "nibba",
-            "nignog",
-            "nogger",
-            "niggor",
-            "negguh",
-            "kneegrow"
-        ]
-
-        LOG_CHANNEL_ID = 1366005332840812633  # Replace with your log channel ID
-
-        msg_lower = message.content.lower()
-        found_bad = [
-            word for word in BAD_WORDS
-            if re.search(rf"\b{re.escape(word)}\b", msg_lower)
-        ]
-
-        if found_bad:
-            try:
-                
-                await message.delete()
-                log_channel = bot.get_channel(LOG_CHANNEL_ID)
-                if log_channel:
-                    embed = discord.Embed(
-                        title="🚨 Rule Violetion Detected",
-                        description=(
-                            f"**User:** {message.author.mention}\n"
-                            f"**Channel:** {message.channel.mention}\n"
-                            f"**Message:** ||{message.content}||"),
-                        color=discord.Color.red())
-                    embed.set_footer(text="Ascented")
-                    await log_channel.send(content = "<@&1379102478666301541>", embed=embed)
-            except discord.Forbidden:
-                print("⚠️ Missing permission to delete or send log.")
-            except discord.HTTPException as e:
-                print(f"❌ Error deleting or logging: {e}")
-            return  # Prevent further processing of deleted message
+import asyncio
+import logging
+import re
+from datetime import timedelta
+
+import discord
+
+import config
+from flood import FloodDetector
+from offenders import OffenderTracker
+
+logger = logging.getLogger(__name__)
+
+ESCALATION_ORDER = ('warn', 'timeout', 'alert')
+LINK_PATTERN = re.compile(r'https?://', re.IGNORECASE)
+
+offenders = OffenderTracker(
+    log_path=config.state_path(config.current()['automod']['violation_log']))
+flood = FloodDetector()
+# Early flush started when the buffer fills; held so it can't be collected
+_flush_task = None
+# channel id -> task that lifts a raid slowmode
+_slowmode_tasks = {}
+
+
+async def flush_violations():
+    """Write buffered violations to the violation log"""
+    offenders.log_path = config.state_path(
+        config.current()['automod']['violation_log'])
+    batch = offenders.take_pending()
+    if batch:
+        await asyncio.to_thread(offenders.write, batch)
+
+
+def is_staff(member, settings):
+    """Moderators and ticket staff are exempt from flood limits"""
+    permissions = getattr(member, 'guild_permissions', None)
+    if permissions is not None and permissions.manage_messages:
+        return True
+    staff_role = settings['ticket'].get('staff_role_id')
+    return staff_role is not None and any(
+        role.id == staff_role for role in getattr(member, 'roles', ()))
+
+
+def log_fields(message):
+    return {
+        'guild': message.guild.id,
+        'channel': message.channel.id,
+        'user': message.author.id
+    }
+
+
+async def escalate(bot, message, settings, action):
+    automod = settings['automod']
+    if action == 'warn':
+        await message.channel.send(
+            f"⚠️ {message.author.mention}, please keep the chat clean. "
+            "Repeated violations will result in a timeout.",
+            delete_after=15)
+        return
+    if isinstance(message.author, discord.Member):
+        await message.author.timeout(
+            timedelta(minutes=automod['timeout_minutes']),
+            reason="Repeated automod violations")
+    if action == 'alert':
+        log_channel = bot.get_channel(automod['log_channel_id'])
+        alert_role = settings.role('automod_alert')
+        mention = f"<@&{alert_role}> " if alert_role else ""
+        if log_channel:
+            await log_channel.send(
+                f"{mention}🚨 {message.author.mention} keeps breaking the rules and has been timed out."
+            )
+
+
+def record_violation(message, settings, reason, weight=1.0):
+    global _flush_task
+    automod = settings['automod']
+    levels = [(name, automod['escalation'][name])
+              for name in ESCALATION_ORDER if name in automod['escalation']]
+    action = offenders.record((message.guild.id, message.author.id),
+                              levels,
+                              automod['half_life_minutes'] * 60,
+                              weight=weight,
+                              reason=reason)
+    if offenders.should_flush() and (_flush_task is None
+                                     or _flush_task.done()):
+        _flush_task = asyncio.create_task(flush_violations())
+    return action
+
+
+async def check_flood(bot, message, settings=None):
+    """Drop messages from flooding users; True if the message was removed"""
+    if message.author.bot:
+        return False
+    settings = settings or config.current()
+    if is_staff(message.author, settings):
+        return False
+    user_key = (message.guild.id, message.author.id)
+    if flood.is_blocked(user_key):
+        try:
+            await message.delete()
+        except discord.HTTPException:
+            pass
+        return True
+
+    content = message.content
+    mentions = len(message.raw_mentions) + len(
+        message.raw_role_mentions) + int(message.mention_everyone)
+    links = len(LINK_PATTERN.findall(content))
+    reason = flood.check(user_key, (message.guild.id, message.channel.id),
+                         content, mentions, links, settings['flood'])
+    if reason is None:
+        return False
+    if reason == 'raid':
+        await slow_channel(bot, message, settings)
+        return False
+
+    action = record_violation(message, settings, f"flood:{reason}",
+                              settings['flood']['violation_weight'])
+    logger.info("Flood detected: %s",
+                reason,
+                extra={
+                    **log_fields(message), 'action': action
+                })
+    try:
+        await message.delete()
+        log_channel = bot.get_channel(settings['automod']['log_channel_id'])
+        if log_channel:
+            embed = discord.Embed(
+                title="🌊 Flood Detected",
+                description=(f"**User:** {message.author.mention}\n"
+                             f"**Channel:** {message.channel.mention}\n"
+                             f"**Reason:** {reason}\n"
+                             f"Messages are dropped for "
+                             f"{settings['flood']['block_seconds']}s."),
+                color=discord.Color.orange())
+            embed.set_footer(text="Ascented")
+            await log_channel.send(embed=embed)
+        if action:
+            await escalate(bot, message, settings, action)
+    except discord.Forbidden:
+        logger.warning("Missing permission to delete, log or time out",
+                       extra=log_fields(message))
+    except discord.HTTPException as e:
+        logger.error("Error deleting or logging: %s",
+                     e,
+                     extra=log_fields(message))
+    return True
+
+
+async def _lift_slowmode(channel, delay, applied, previous):
+    await asyncio.sleep(delay)
+    try:
+        if channel.slowmode_delay == applied:
+            await channel.edit(slowmode_delay=previous,
+                               reason="Raid slowmode expired")
+    except discord.HTTPException as e:
+        logger.error("Error lifting slowmode: %s", e)
+    finally:
+        _slowmode_tasks.pop(channel.id, None)
+
+
+async def slow_channel(bot, message, settings):
+    """Put a raided channel in slowmode for a while and alert moderators"""
+    limits = settings['flood']
+    channel = message.channel
+    seconds = limits['raid_slowmode_seconds']
+    duration = limits['raid_slowmode_minutes'] * 60
+    logger.info("Channel raid detected", extra=log_fields(message))
+    try:
+        previous = getattr(channel, 'slowmode_delay', None)
+        if previous is not None and previous < seconds:
+            await channel.edit(slowmode_delay=seconds,
+                               reason="Same message posted by many users")
+            task = _slowmode_tasks.pop(channel.id, None)
+            if task is not None:
+                task.cancel()
+            _slowmode_tasks[channel.id] = asyncio.create_task(
+                _lift_slowmode(channel, duration, seconds, previous))
+        log_channel = bot.get_channel(settings['automod']['log_channel_id'])
+        if log_channel:
+            alert_role = settings.role('automod_alert')
+            embed = discord.Embed(
+                title="🌊 Possible Raid",
+                description=(f"**Channel:** {channel.mention}\n"
+                             f"The same message was posted more than "
+                             f"{limits['channel_max_duplicates']} times in "
+                             f"{limits['window_seconds']}s. Slowmode is "
+                             f"{seconds}s for the next "
+                             f"{limits['raid_slowmode_minutes']} minutes."),
+                color=discord.Color.orange())
+            embed.set_footer(text="Ascented")
+            await log_channel.send(
+                content=f"<@&{alert_role}>" if alert_role else None,
+                embed=embed)
+    except discord.Forbidden:
+        logger.warning("Missing permission to set slowmode or alert",
+                       extra=log_fields(message))
+    except discord.HTTPException as e:
+        logger.error("Error handling raid: %s", e, extra=log_fields(message))
+
+
+async def check_message(bot, message, settings=None):
+    """Delete messages containing blocked words; True if one was removed"""
+    settings = settings or config.current()
+    content = message.content.lower()
+    if not settings.bad_words.search(content) and not (
+            settings.fuzzy and settings.fuzzy.search(content)):
+        return False
+
+    automod = settings['automod']
+    action = record_violation(message, settings, 'blocked_word')
+    logger.info("Blocked word removed",
+                extra={
+                    **log_fields(message), 'action': action
+                })
+
+    try:
+        await message.delete()
+        log_channel = bot.get_channel(automod['log_channel_id'])
+        if log_channel:
+            embed = discord.Embed(
+                title="🚨 Rule Violetion Detected",
+                description=(f"**User:** {message.author.mention}\n"
+                             f"**Channel:** {message.channel.mention}\n"
+                             f"**Message:** ||{message.content}||"),
+                color=discord.Color.red())
+            embed.set_footer(text="Ascented")
+            await log_channel.send(embed=embed)
+        if action:
+            await escalate(bot, message, settings, action)
+    except discord.Forbidden:
+        logger.warning("Missing permission to delete, log or time out",
+                       extra=log_fields(message))
+    except discord.HTTPException as e:
+        logger.error("Error deleting or logging: %s",
+                     e,
+                     extra=log_fields(message))
+    return True  # Prevent further processing of deleted message
@@ -0,0 +1,119 @@
+"""Precision/recall and throughput of the automod word matchers.
+
+Run with ``python bench_automod.py [WORD_LIST]``. Disguised spellings are
+generated from the blocked word list. Clean text is a general English word
+list (``/usr/share/dict/words`` by default, falling back to the vocabulary
+of Python's bundled documentation) plus words reported as false positives,
+so the clean side shares nothing with allowed_words.txt by construction.
+"""
+import os
+import random
+import re
+import sys
+import time
+
+import config
+from fuzzy import FuzzyMatcher
+
+DICTIONARY = '/usr/share/dict/words'
+
+# Ordinary words earlier fuzzy settings flagged; always part of the clean set.
+KNOWN_FALSE_POSITIVES = [
+    "shirt", "shift", "clock", "cocky", "salvage", "pushy", "jerky", "niger",
+    "yankees", "chinos", "arise", "blocks", "pause", "sausage", "slots"
+]
+
+FILLERS = ["you are a", "lol", "stop being a", "what a", "shut up", "ok"]
+
+
+def english_words(path=DICTIONARY):
+    if os.path.exists(path):
+        with open(path, encoding='utf-8', errors='ignore') as fh:
+            words = {line.strip().lower() for line in fh}
+        source = path
+    else:
+        from pydoc_data.topics import topics
+        words = set(re.findall(r'[a-z]+', ' '.join(topics.values()).lower()))
+        source = "Python documentation vocabulary"
+    words = {word for word in words if word.isalpha() and len(word) >= 4}
+    return sorted(words | set(KNOWN_FALSE_POSITIVES)), source
+
+
+def disguise(word, rng):
+    """One evasive spelling of `word`."""
+    style = rng.randrange(5)
+    if style == 0:  # stretched letters
+        i = rng.randrange(len(word))
+        return word[:i] + word[i] * rng.randint(2, 4) + word[i + 1:]
+    if style == 1:  # leetspeak
+        table = {'a': '4', 'e': '3', 'i': '1', 'o': '0', 's': '5'}
+        return ''.join(table.get(c, c) for c in word)
+    if style == 2:  # dotted
+        return '.'.join(word)
+    if style == 3:  # extra letter
+        i = rng.randrange(1, len(word))
+        return word[:i] + rng.choice('aeiouhy') + word[i:]
+    return word + rng.choice(['!', 's', 'z', '?'])
+
+
+def build_corpus(words, clean_words, exact, rng, samples=400):
+    targets = [word for word in words if ' ' not in word and len(word) >= 4
+               and word.isalpha()]
+    offensive = [
+        f"{rng.choice(FILLERS)} {disguise(rng.choice(targets), rng)}"
+        for _ in range(samples)
+    ]
+    # Dictionary entries that are themselves blocked aren't clean text.
+    clean = [word for word in clean_words if not exact.search(word)]
+    return [(text, True) for text in offensive] + [(text, False)
+                                                  for text in clean]
+
+
+def evaluate(name, detect, corpus, rounds=5):
+    true_pos = false_neg = 0
+    false_pos = []
+    for text, offensive in corpus:
+        flagged = bool(detect(text))
+        true_pos += flagged and offensive
+        false_neg += offensive and not flagged
+        if flagged and not offensive:
+            false_pos.append(text)
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for text, _ in corpus:
+            detect(text)
+    elapsed = time.perf_counter() - started
+    precision = true_pos / max(true_pos + len(false_pos), 1)
+    recall = true_pos / max(true_pos + false_neg, 1)
+    print(f"{name:<14} precision {precision:6.1%}  recall {recall:6.1%}  "
+          f"{rounds * len(corpus) / elapsed:10,.0f} msg/s  "
+          f"({len(false_pos)} false positives)")
+    if false_pos:
+        print(f"{'':<14} {', '.join(false_pos[:40])}"
+              f"{' ...' if len(false_pos) > 40 else ''}")
+
+
+def main():
+    settings = config.current()
+    words = config.read_word_list(settings.sources[1])
+    whitelist = config.read_word_list(settings.sources[2])
+    clean_words, source = english_words(*sys.argv[1:2])
+    exact = settings.bad_words
+    corpus = build_corpus(words, clean_words, exact, random.Random(1234))
+    print(f"{len(corpus)} messages ({len(clean_words)} clean words from "
+          f"{source}), {settings.word_count} blocked words")
+    evaluate("exact", lambda text: exact.search(text.lower()), corpus)
+    min_length = settings['automod']['fuzzy']['min_length']
+    for max_distance in (0, 1):
+        fuzzy = FuzzyMatcher(words,
+                             whitelist,
+                             max_distance=max_distance,
+                             min_length=min_length)
+        evaluate(
+            f"+fuzzy d={max_distance}",
+            lambda text: exact.search(text.lower()) or fuzzy.search(
+                text.lower()), corpus)
+
+
+if __name__ == '__main__':
+    main()
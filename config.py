@@ -0,0 +1,304 @@
+import copy
+import json
+import logging
+import os
+import re
+import time
+
+from fuzzy import FuzzyMatcher
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PATH = os.getenv("BOT_CONFIG", "config.json")
+
+# Built-in settings; config.json is merged over these.
+DEFAULTS = {
+    'channels': {
+        'general': None,
+        'ping': None,
+    },
+    'roles': {},
+    'colors': {
+        'E': 0x808080,
+        'D': 0x8B4513,
+        'C': 0x00FF00,
+        'B': 0x0000FF,
+        'A': 0x800080,
+        'S': 0xFF4500,
+        'SS': 0xFF0000
+    },
+    'role_mentions': {},
+    'cooldown_seconds': 5,
+    'max_dungeons_per_hour': 10,
+
+    # Announcer messages are parsed once they stop being edited
+    'detection': {
+        'debounce_seconds': 1.5,
+        'late_embed_seconds': 5,
+    },
+
+    # Pre-alert when a high-rank spawn is statistically due
+    'forecast': {
+        'prealerts': False,
+        'ranks': ['S', 'SS'],
+        'horizon_minutes': 15,
+        'probability': 0.6,
+    },
+    # Unset IDs leave tickets uncategorised and without a staff role/log
+    'ticket': {
+        'category_id': None,
+        'log_channel_id': None,
+        'staff_role_id': None,
+    },
+    'automod': {
+        'word_list': 'bad_words.txt',
+        'log_channel_id': None,
+        # Decaying violation score at which each escalation step fires
+        'escalation': {
+            'warn': 1,
+            'timeout': 3,
+            'alert': 5,
+        },
+        'half_life_minutes': 60,
+        'timeout_minutes': 10,
+        # Relative to state_dir
+        'violation_log': 'violations.jsonl',
+        # Matching for disguised words. Off by default; max_distance above
+        # 0 also flags ordinary words (shirt, clock)
+        'fuzzy': {
+            'enabled': False,
+            'max_distance': 0,
+            'min_length': 4,
+            'whitelist': 'allowed_words.txt',
+        },
+    },
+
+    # Per-user/per-channel limits within a rolling window
+    'flood': {
+        'window_seconds': 10,
+        'max_messages': 6,
+        'max_duplicates': 3,
+        'max_mentions': 8,
+        'max_links': 4,
+        # Same text from many users; slows the channel, nobody is blocked
+        'channel_max_duplicates': 5,
+        'raid_min_length': 10,
+        'raid_ignore': ['gg', 'gz', 'ty', 'congrats', 'congratulations'],
+        'raid_slowmode_seconds': 10,
+        'raid_slowmode_minutes': 5,
+        'block_seconds': 60,
+        'violation_weight': 2,
+    },
+    'watch_seconds': 5,
+
+    # Per-guild state is loaded on first event and archived when idle
+    'state_dir': 'data',
+    'guild_idle_minutes': 60,
+
+    # State snapshot in state_dir, written periodically and on SIGTERM
+    'shutdown': {
+        'deadline_seconds': 20,
+        'drain_seconds': 5,
+        'snapshot_minutes': 10,
+        'snapshot_file': 'state.snap',
+    },
+
+    # Passed to logsetup.setup; INFO lines using one of sample_templates
+    # are sampled once they repeat, all others are always logged
+    'logging': {
+        'level': 'INFO',
+        'json_output': True,
+        'sample_templates': ['Duplicate dungeon detected, skipping'],
+        'burst': 5,
+        'interval': 60,
+        'every': 100,
+    },
+
+    # Per-guild overrides keyed by guild ID, merged over everything above
+    'guilds': {},
+}
+
+# Channels that fall back to environment variables when left unset.
+ENV_CHANNELS = {
+    'general': 'GENERAL_CHANNEL_ID',
+    'ping': 'PING_CHANNEL_ID',
+}
+
+
+class ConfigError(Exception):
+    pass
+
+
+class Snapshot:
+    """Immutable view of one loaded config plus its compiled matcher.
+
+    Readers grab `current()` once per event and never lock; a reload builds
+    a new snapshot and swaps the module reference in one assignment.
+    """
+
+    def __init__(self, data, bad_words, fuzzy, word_count, sources,
+                 compile_ms):
+        self.data = data
+        self.bad_words = bad_words
+        self.fuzzy = fuzzy
+        self.word_count = word_count
+        self.sources = sources
+        self.compile_ms = compile_ms
+        self.loaded_at = time.time()
+        self._guild_views = {}
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def get(self, key, default=None):
+        return self.data.get(key, default)
+
+    def role(self, name):
+        return self.data['roles'].get(name)
+
+    def channel(self, name):
+        return self.data['channels'].get(name)
+
+    def for_guild(self, guild_id):
+        """Snapshot with the guild's overrides applied, built once per load."""
+        view = self._guild_views.get(guild_id)
+        if view is None:
+            overrides = self.data['guilds'].get(str(guild_id))
+            if not overrides:
+                view = self
+            else:
+                view = Snapshot(_merge(self.data, overrides), self.bad_words,
+                                self.fuzzy, self.word_count, self.sources,
+                                self.compile_ms)
+                view.loaded_at = self.loaded_at
+            self._guild_views[guild_id] = view
+        return view
+
+
+def _merge(base, override):
+    merged = copy.deepcopy(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def _resolve_path(path, relative_to):
+    if os.path.isabs(path):
+        return path
+    return os.path.join(os.path.dirname(os.path.abspath(relative_to)), path)
+
+
+def read_word_list(path):
+    words = []
+    with open(path, encoding='utf-8') as fh:
+        for line in fh:
+            word = line.strip().lower()
+            if word and not word.startswith('#'):
+                words.append(word)
+    return words
+
+
+def compile_word_matcher(words):
+    """One alternation with per-word `\\b` anchors, longest words first."""
+    unique = sorted(set(words), key=len, reverse=True)
+    if not unique:
+        return re.compile(r'(?!x)x')
+    return re.compile('|'.join(rf"\b{re.escape(word)}\b" for word in unique))
+
+
+def load(path=CONFIG_PATH):
+    """Read config and word list from disk and compile a new snapshot."""
+    try:
+        with open(path, encoding='utf-8') as fh:
+            data = _merge(DEFAULTS, json.load(fh))
+    except FileNotFoundError:
+        data = _merge(DEFAULTS, {})
+    except (OSError, ValueError) as e:
+        raise ConfigError(f"Could not read {path}: {e}")
+
+    # Passed to logsetup.setup as keyword arguments
+    unknown = set(data['logging']) - set(DEFAULTS['logging'])
+    if unknown:
+        raise ConfigError(
+            f"Unknown logging settings in {path}: {', '.join(sorted(unknown))}")
+    data['logging']['level'] = str(data['logging']['level']).upper()
+    if not isinstance(logging.getLevelName(data['logging']['level']), int):
+        raise ConfigError(
+            f"Unknown log level in {path}: {data['logging']['level']}")
+
+    for name, env_var in ENV_CHANNELS.items():
+        if data['channels'].get(name) is None and os.getenv(env_var):
+            data['channels'][name] = int(os.getenv(env_var))
+    # JSON object keys are strings; rank colors/mentions are keyed by rank.
+    data['colors'] = {
+        rank.upper(): int(color)
+        for rank, color in data['colors'].items()
+    }
+
+    fuzzy_settings = data['automod']['fuzzy']
+    word_path = _resolve_path(data['automod']['word_list'], path)
+    whitelist_path = _resolve_path(fuzzy_settings['whitelist'], path)
+    try:
+        words = read_word_list(word_path)
+        whitelist = read_word_list(whitelist_path)
+    except OSError as e:
+        raise ConfigError(f"Could not read word list: {e}")
+
+    started = time.perf_counter()
+    matcher = compile_word_matcher(words)
+    fuzzy = None
+    if fuzzy_settings['enabled']:
+        fuzzy = FuzzyMatcher(words,
+                             whitelist,
+                             max_distance=fuzzy_settings['max_distance'],
+                             min_length=fuzzy_settings['min_length'])
+    compile_ms = (time.perf_counter() - started) * 1000
+    return Snapshot(data, matcher, fuzzy, len(set(words)),
+                    (path, word_path, whitelist_path), compile_ms)
+
+
+def _mtimes(sources):
+    mtimes = []
+    for source in sources:
+        try:
+            mtimes.append(os.stat(source).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+_current = load()
+_mtimes_seen = _mtimes(_current.sources)
+
+
+def current():
+    return _current
+
+
+def state_path(name, settings=None):
+    """`name` resolved against state_dir, unless it is already absolute."""
+    return os.path.join((settings or _current)['state_dir'], name)
+
+
+def reload(path=CONFIG_PATH):
+    """Load a fresh snapshot and swap it in; the old one stays on error."""
+    global _current, _mtimes_seen
+    seen = _mtimes(_current.sources)
+    try:
+        snapshot = load(path)
+    except ConfigError:
+        _mtimes_seen = seen  # don't retry a broken file until it changes
+        raise
+    _current = snapshot
+    _mtimes_seen = _mtimes(snapshot.sources)
+    logger.info("Config reloaded: %s words compiled in %.2f ms",
+                snapshot.word_count, snapshot.compile_ms)
+    return snapshot
+
+
+def changed():
+    """True when the config file or word list changed since the last load."""
+    return _mtimes(_current.sources) != _mtimes_seen
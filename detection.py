@@ -0,0 +1,101 @@
+import asyncio
+from collections import OrderedDict
+
+# Results a detection handler returns for a settled message.
+ALERTED = 'alerted'  # spawn handled; later edits are ignored
+IGNORED = 'ignored'  # nothing to do now; a changed edit is parsed again
+INCOMPLETE = 'incomplete'  # looks like a spawn but fields are missing
+
+
+def _embed_lines(embed):
+    if hasattr(embed, 'to_dict'):
+        embed = embed.to_dict()
+    for key in ('title', 'description'):
+        if embed.get(key):
+            yield embed[key]
+    for field in embed.get('fields', ()):
+        yield f"{field.get('name', '')}: {field.get('value', '')}"
+    footer = embed.get('footer') or {}
+    if footer.get('text'):
+        yield footer['text']
+
+
+def message_text(content, embeds):
+    """Flatten message content and embeds (objects or raw dicts) to text."""
+    lines = [content] if content else []
+    for embed in embeds or ():
+        lines.extend(_embed_lines(embed))
+    return '\n'.join(lines)
+
+
+class DetectionPipeline:
+    """Debounced, once-per-content parsing of messages and their edits.
+
+    Every submission for a message restarts its timer; the handler runs
+    once the message has been quiet for `debounce_seconds`, and never twice
+    at once for the same message. Edits that arrive mid-run are parsed
+    afterwards unless the run alerted. Incomplete spawns get one more look
+    after `late_embed_seconds` in case the announcer fills in an embed late.
+    """
+
+    def __init__(self,
+                 handler,
+                 debounce_seconds=1.5,
+                 late_embed_seconds=5.0,
+                 max_entries=2048):
+        self.handler = handler
+        self.debounce_seconds = debounce_seconds
+        self.late_embed_seconds = late_embed_seconds
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def submit(self, message_id, text, context):
+        entry = self.entries.get(message_id)
+        digest = hash(text)
+        if entry is not None:
+            self.entries.move_to_end(message_id)
+            if entry['state'] == ALERTED or entry['digest'] == digest:
+                return
+            entry['digest'] = digest
+            if entry['running']:
+                # Parse the newest text once the current run has finished.
+                entry['pending'] = (text, context)
+                return
+            if entry['task'] is not None:
+                entry['task'].cancel()
+        else:
+            entry = self.entries[message_id] = {
+                'state': None,
+                'task': None,
+                'running': False,
+                'pending': None,
+                'digest': digest
+            }
+            while len(self.entries) > self.max_entries:
+                _, stale = self.entries.popitem(last=False)
+                if stale['task'] is not None and not stale['running']:
+                    stale['task'].cancel()
+        entry['task'] = asyncio.create_task(
+            self._settle(entry, text, context, self.debounce_seconds, False))
+
+    async def _settle(self, entry, text, context, delay, final):
+        await asyncio.sleep(delay)
+        if entry['state'] == ALERTED:
+            return
+        entry['running'] = True
+        try:
+            state = await self.handler(text, context, final)
+        finally:
+            entry['running'] = False
+            entry['task'] = None
+        entry['state'] = state
+        pending, entry['pending'] = entry['pending'], None
+        if state == ALERTED:
+            return
+        if pending is not None:
+            entry['task'] = asyncio.create_task(
+                self._settle(entry, *pending, self.debounce_seconds, False))
+        elif state == INCOMPLETE and not final:
+            entry['task'] = asyncio.create_task(
+                self._settle(entry, text, context, self.late_embed_seconds,
+                             True))
@@ -0,0 +1,121 @@
+import time
+from collections import OrderedDict, deque
+
+
+class _Window:
+    """Sliding window of recent messages with running totals."""
+
+    __slots__ = ('events', 'digests', 'mentions', 'links')
+
+    def __init__(self):
+        self.events = deque()
+        self.digests = {}
+        self.mentions = 0
+        self.links = 0
+
+    def push(self, now, digest, mentions, links):
+        self.events.append((now, digest, mentions, links))
+        if digest is not None:
+            self.digests[digest] = self.digests.get(digest, 0) + 1
+        self.mentions += mentions
+        self.links += links
+
+    def expire(self, cutoff):
+        events = self.events
+        while events and events[0][0] < cutoff:
+            _, digest, mentions, links = events.popleft()
+            if digest is not None:
+                count = self.digests[digest] - 1
+                if count:
+                    self.digests[digest] = count
+                else:
+                    del self.digests[digest]
+            self.mentions -= mentions
+            self.links -= links
+
+
+class FloodDetector:
+    """Rolling per-user and per-channel flood windows.
+
+    Each message costs O(1) amortised regardless of window size. Users who
+    trip a limit are blocked for `block_seconds`; `is_blocked` is a single
+    dict lookup so their later messages can be dropped before any parsing.
+    A channel-wide 'raid' never blocks the poster: it is reported once per
+    `block_seconds` so the caller can act on the channel instead. Short
+    texts and those in `raid_ignore` ("gg", "congrats") don't count toward it.
+    """
+
+    def __init__(self, max_entries=5000):
+        self.max_entries = max_entries
+        self.users = OrderedDict()
+        self.channels = OrderedDict()
+        self.blocked = {}
+        self.raided = {}
+
+    def _window(self, table, key):
+        window = table.get(key)
+        if window is None:
+            window = table[key] = _Window()
+            while len(table) > self.max_entries:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return window
+
+    def is_blocked(self, key, now=None):
+        until = self.blocked.get(key)
+        if until is None:
+            return False
+        if (time.monotonic() if now is None else now) < until:
+            return True
+        del self.blocked[key]
+        return False
+
+    def check(self, user_key, channel_key, content, mentions, links, limits,
+              now=None):
+        """Record a message and return the tripped limit's name, if any."""
+        now = time.monotonic() if now is None else now
+        cutoff = now - limits['window_seconds']
+        # Attachment-only messages have no text to compare.
+        text = content.strip().lower()
+        digest = hash(text) if text else None
+
+        user = self._window(self.users, user_key)
+        user.expire(cutoff)
+        user.push(now, digest, mentions, links)
+        channel = self._window(self.channels, channel_key)
+        channel.expire(cutoff)
+        common = (len(text) < limits['raid_min_length']
+                  or text.strip(' !?.') in limits['raid_ignore'])
+        channel_digest = None if common else digest
+        channel.push(now, channel_digest, 0, 0)
+
+        reason = None
+        if len(user.events) > limits['max_messages']:
+            reason = 'messages'
+        elif digest is not None and user.digests[
+                digest] > limits['max_duplicates']:
+            reason = 'duplicates'
+        elif user.mentions > limits['max_mentions']:
+            reason = 'mentions'
+        elif user.links > limits['max_links']:
+            reason = 'links'
+        elif channel_digest is not None and channel.digests[
+                channel_digest] > limits['channel_max_duplicates']:
+            if self.raided.get(channel_key, 0) > now:
+                return None
+            self.raided[channel_key] = now + limits['block_seconds']
+            if len(self.raided) > self.max_entries:
+                self.raided = {
+                    key: until
+                    for key, until in self.raided.items() if until > now
+                }
+            return 'raid'
+        if reason:
+            self.blocked[user_key] = now + limits['block_seconds']
+            if len(self.blocked) > self.max_entries:
+                self.blocked = {
+                    key: until
+                    for key, until in self.blocked.items() if until > now
+                }
+        return reason
@@ -0,0 +1,263 @@
+import bisect
+import time
+
+try:
+    import numpy as np
+except ImportError:  # forecasting still works, rebuilds just run in Python
+    np = None
+
+# Inter-arrival histogram edges in seconds: 1 minute doubling every two bins
+# up to roughly a week. The last bin is open-ended and treated as 2x wide.
+BIN_EDGES = [60 * 2**(i / 2) for i in range(28)]
+_FULL_EDGES = [0.0] + BIN_EDGES + [BIN_EDGES[-1] * 2]
+
+# Rebuilds over at least this many spawns use NumPy when it is available.
+VECTORIZE_THRESHOLD = 5000
+
+# Fewer observed gaps than this outlasting the current wait means the
+# history can't say when the next spawn comes; the series is just overdue.
+MIN_SUPPORT = 3
+
+KINDS = ('rank', 'island')
+
+
+def _key_for(dungeon_info, kind):
+    value = dungeon_info[kind]
+    return value.upper() if kind == 'rank' else value
+
+
+def _bin(gap):
+    return min(bisect.bisect_right(BIN_EDGES, gap), len(_FULL_EDGES) - 2)
+
+
+def gap_histograms(kind, keys, key_ids, timestamps):
+    """Per-key gap histograms for `kind` in one grouped NumPy pass.
+
+    `timestamps` must be sorted; row i belongs to ``keys[key_ids[i]]``.
+    Returns ``{(kind, key): (counts, samples, gap_total, first, last)}``
+    for `Forecaster.merge`.
+    """
+    bins = len(_FULL_EDGES) - 1
+    order = np.argsort(key_ids, kind='stable')
+    ids = np.asarray(key_ids)[order]
+    stamps = np.asarray(timestamps, dtype=np.float64)[order]
+    same = ids[1:] == ids[:-1]
+    gaps = np.diff(stamps)[same]
+    gap_ids = ids[1:][same]
+    slots = gap_ids * bins + np.minimum(
+        np.searchsorted(BIN_EDGES, gaps, side='right'), bins - 1)
+    counts = np.bincount(slots, minlength=len(keys) * bins).reshape(
+        len(keys), bins)
+    totals = np.bincount(gap_ids, weights=gaps, minlength=len(keys))
+    present, starts, sizes = np.unique(ids,
+                                       return_index=True,
+                                       return_counts=True)
+    return {(kind, keys[i]): (counts[i].tolist(), int(size) - 1,
+                              float(totals[i]), float(stamps[start]),
+                              float(stamps[start + size - 1]))
+            for i, start, size in zip(present.tolist(), starts.tolist(),
+                                      sizes.tolist())}
+
+
+class ArrivalSeries:
+    """Inter-arrival histogram for one rank or island."""
+
+    def __init__(self):
+        self.last = None
+        self.counts = [0] * (len(_FULL_EDGES) - 1)
+        self.samples = 0
+        self.gap_total = 0.0
+        self._cumulative = None
+
+    def add(self, timestamp):
+        if self.last is not None and timestamp >= self.last:
+            gap = timestamp - self.last
+            self.counts[_bin(gap)] += 1
+            self.samples += 1
+            self.gap_total += gap
+            self._cumulative = None
+        if self.last is None or timestamp > self.last:
+            self.last = timestamp
+
+    def add_gaps(self, counts, samples, gap_total, first, last):
+        """Merge the histogram of a batch spanning `first` to `last`.
+
+        The batch's own gaps always count. The gap joining it to this
+        series is only known, and counted, when the batch starts after
+        the latest arrival seen so far.
+        """
+        if self.last is not None and first >= self.last:
+            self.add(first)
+        for index, count in enumerate(counts):
+            self.counts[index] += int(count)
+        self.samples += int(samples)
+        self.gap_total += float(gap_total)
+        if last is not None and (self.last is None or last > self.last):
+            self.last = float(last)
+        self._cumulative = None
+
+    def _cdf_points(self):
+        if self._cumulative is None:
+            cumulative = [0]
+            for count in self.counts:
+                cumulative.append(cumulative[-1] + count)
+            self._cumulative = cumulative
+        return self._cumulative
+
+    def survival(self, seconds):
+        """Fraction of observed gaps longer than `seconds`."""
+        if not self.samples:
+            return 1.0
+        cumulative = self._cdf_points()
+        if seconds >= _FULL_EDGES[-1]:
+            return 0.0
+        index = bisect.bisect_right(_FULL_EDGES, seconds) - 1
+        low, high = _FULL_EDGES[index], _FULL_EDGES[index + 1]
+        below = cumulative[index] + (cumulative[index + 1] -
+                                     cumulative[index]) * (seconds -
+                                                           low) / (high - low)
+        return 1.0 - below / self.samples
+
+    def inverse_survival(self, fraction):
+        """Smallest gap length whose survival drops to `fraction`."""
+        cumulative = self._cdf_points()
+        target = (1.0 - fraction) * self.samples
+        index = bisect.bisect_left(cumulative, target)
+        if index == 0:
+            return 0.0
+        if index >= len(cumulative):
+            return _FULL_EDGES[-1]
+        low_count, high_count = cumulative[index - 1], cumulative[index]
+        low, high = _FULL_EDGES[index - 1], _FULL_EDGES[index]
+        if high_count == low_count:
+            return low
+        return low + (high - low) * (target - low_count) / (high_count -
+                                                             low_count)
+
+    def supports(self, elapsed):
+        """True when enough observed gaps were longer than `elapsed`."""
+        return self.survival(elapsed) * self.samples >= MIN_SUPPORT
+
+    def probability_within(self, elapsed, horizon):
+        """Chance of the next arrival within `horizon` given `elapsed`.
+
+        None once the wait has outlasted what the history supports.
+        """
+        if not self.supports(elapsed):
+            return None
+        remaining = self.survival(elapsed)
+        return (remaining - self.survival(elapsed + horizon)) / remaining
+
+
+class Forecaster:
+    """Per-rank and per-island spawn forecasts from inter-arrival history."""
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.series = {}
+        self.alerted = set()
+
+    def _series(self, kind, key):
+        series = self.series.get((kind, key))
+        if series is None:
+            series = self.series[(kind, key)] = ArrivalSeries()
+        return series
+
+    def record(self, dungeon_info, timestamp=None):
+        timestamp = self.clock() if timestamp is None else timestamp
+        for kind in KINDS:
+            key = _key_for(dungeon_info, kind)
+            self._series(kind, key).add(timestamp)
+            self.alerted.discard((kind, key))
+
+    def merge(self, histograms):
+        """Fold in `gap_histograms` output for a batch of any age."""
+        for (kind, key), histogram in histograms.items():
+            self._series(kind, key).add_gaps(*histogram)
+
+    def rebuild(self, records):
+        """Fold a batch of history records (with ``timestamp``) in at once."""
+        records = list(records)
+        if np is not None and len(records) >= VECTORIZE_THRESHOLD:
+            self.merge(self._histograms_vectorized(records))
+        else:
+            self.merge(self._histograms(records))
+
+    def _histograms(self, records):
+        grouped = {}
+        for record in records:
+            timestamp = record['timestamp'].timestamp()
+            for kind in KINDS:
+                grouped.setdefault((kind, _key_for(record, kind)),
+                                   []).append(timestamp)
+        histograms = {}
+        for series_key, stamps in grouped.items():
+            stamps.sort()
+            counts = [0] * (len(_FULL_EDGES) - 1)
+            for previous, current in zip(stamps, stamps[1:]):
+                counts[_bin(current - previous)] += 1
+            histograms[series_key] = (counts, len(stamps) - 1,
+                                      stamps[-1] - stamps[0], stamps[0],
+                                      stamps[-1])
+        return histograms
+
+    def _histograms_vectorized(self, records):
+        timestamps = np.fromiter(
+            (record['timestamp'].timestamp() for record in records),
+            dtype=np.float64,
+            count=len(records))
+        order = np.argsort(timestamps, kind='stable')
+        histograms = {}
+        for kind in KINDS:
+            keys, key_ids = np.unique(np.array(
+                [_key_for(record, kind) for record in records], dtype=object),
+                                      return_inverse=True)
+            histograms.update(
+                gap_histograms(kind, keys.tolist(), key_ids[order],
+                               timestamps[order]))
+        return histograms
+
+    def forecast(self, kind, key, horizons=(900, 1800, 3600)):
+        series = self.series.get((kind, key))
+        if series is None or not series.samples:
+            return None
+        now = self.clock()
+        elapsed = max(now - series.last, 0.0)
+        result = {
+            'samples': series.samples,
+            'mean_gap': series.gap_total / series.samples,
+            'median_gap': series.inverse_survival(0.5),
+            'since_last': elapsed,
+            'overdue': not series.supports(elapsed),
+            'expected_in': None,
+            'within': None,
+        }
+        if not result['overdue']:
+            remaining = series.survival(elapsed)
+            result['expected_in'] = max(
+                series.inverse_survival(remaining / 2) - elapsed, 0.0)
+            result['within'] = {
+                horizon: series.probability_within(elapsed, horizon)
+                for horizon in horizons
+            }
+        return result
+
+    def due_alerts(self, ranks, horizon, threshold):
+        """Ranks whose next spawn within `horizon` reaches `threshold`.
+
+        Each rank is returned once until it spawns again. Overdue ranks,
+        where the history has no support past the current wait, never are.
+        """
+        now = self.clock()
+        due = []
+        for rank in ranks:
+            series = self.series.get(('rank', rank))
+            if (series is None or not series.samples
+                    or ('rank', rank) in self.alerted):
+                continue
+            probability = series.probability_within(now - series.last,
+                                                    horizon)
+            if probability is not None and probability >= threshold:
+                self.alerted.add(('rank', rank))
+                due.append((rank, probability))
+        return due
@@ -0,0 +1,189 @@
+import re
+from collections import OrderedDict
+
+# Character substitutions commonly used to dodge word filters.
+LOOKALIKES = str.maketrans({
+    '0': 'o',
+    '1': 'i',
+    '3': 'e',
+    '4': 'a',
+    '5': 's',
+    '7': 't',
+    '8': 'b',
+    '9': 'g',
+    '@': 'a',
+    '$': 's',
+    '!': 'i',
+    '|': 'l',
+    'q': 'g',
+    'v': 'u',
+})
+_SEPARATORS = re.compile(r'[^a-z0-9@$!|]')
+_REPEATS = re.compile(r'(.)\1+')
+_STRETCHED = re.compile(r'(.)\1\1')
+
+
+def unmask(token):
+    """Lookalikes mapped and separators dropped, letter runs kept."""
+    return _SEPARATORS.sub('', token.lower()).translate(LOOKALIKES)
+
+
+def normalize(token):
+    """Canonical form: lookalikes mapped, separators dropped, runs collapsed.
+
+    ``f.u.u.u.c.k``, ``fuuuck`` and ``fvck`` all become ``fuck``, and
+    ``niqqa`` meets ``nigga`` at ``niga``.
+    """
+    return _REPEATS.sub(r'\1', unmask(token))
+
+
+def is_plain(token):
+    """True for an ordinary spelling: only letters, no run of three.
+
+    Sentence punctuation around the word doesn't count as a disguise.
+    """
+    token = token.strip('.,;:?"\'()')
+    return token.isalpha() and not _STRETCHED.search(token.lower())
+
+
+def distance(a, b, limit):
+    """Insert/delete edit distance, or ``limit + 1`` past `limit`.
+
+    Substitutions cost two edits: swapping a letter turns too many real
+    words into blocked ones (witch/bitch, where/whore), while inserted or
+    dropped letters are the usual evasion.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        best = i
+        for j, char_b in enumerate(b, 1):
+            cost = previous[j - 1] + (0 if char_a == char_b else 2)
+            cost = min(cost, previous[j] + 1, current[j - 1] + 1)
+            current.append(cost)
+            best = min(best, cost)
+        if best > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+class BKTree:
+    """Burkhard-Keller tree for bounded edit-distance lookups."""
+
+    def __init__(self, words=()):
+        self.root = None
+        for word in words:
+            self.add(word)
+
+    def add(self, word):
+        if self.root is None:
+            self.root = (word, {})
+            return
+        node = self.root
+        while True:
+            # Exact distance is needed to pick the child edge.
+            d = distance(word, node[0], len(word) + len(node[0]))
+            if d == 0:
+                return
+            child = node[1].get(d)
+            if child is None:
+                node[1][d] = (word, {})
+                return
+            node = child
+
+    def search(self, word, limit):
+        """First stored word within `limit` edits of `word`, or None."""
+        if self.root is None:
+            return None
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            # Past limit + the widest edge no child can be in range either.
+            cutoff = limit + max(children, default=0)
+            d = distance(word, node_word, cutoff)
+            if d <= limit:
+                return node_word
+            if d > cutoff:
+                continue
+            # Triangle inequality: only children in [d-limit, d+limit].
+            for edge in range(d - limit, d + limit + 1):
+                child = children.get(edge)
+                if child is not None:
+                    stack.append(child)
+        return None
+
+
+class FuzzyMatcher:
+    """Per-token fuzzy lookup against canonical blocked words.
+
+    Only words of at least `min_length` canonical characters are indexed
+    and only tokens that long are checked, since short words sit within
+    one edit of too much ordinary text.
+
+    With the default `max_distance` of 0 no letter is ever added or
+    dropped. Disguised tokens (digits, symbols, separators or a stretched
+    letter) match if they normalise to a blocked word; plain words keep
+    their double letters, so ``fvck`` matches but ``niger`` and ``slot``
+    don't collapse into ``nigger`` and ``sloot``. Any higher distance also
+    flags ordinary words (shirt, clock, pushy).
+    """
+
+    _TOKENS = re.compile(r'\S+')
+
+    def __init__(self, words, whitelist=(), max_distance=0, min_length=4,
+                 cache_size=4096):
+        self.max_distance = max_distance
+        self.min_length = min_length
+        self.whitelist = {normalize(word) for word in whitelist}
+        self.whitelist.update(word.lower() for word in whitelist)
+        canonical = {normalize(word) for word in words if ' ' not in word}
+        self.words = {word for word in canonical if len(word) >= min_length}
+        self.plain_words = {
+            unmask(word)
+            for word in words
+            if ' ' not in word and normalize(word) in self.words
+        }
+        self.tree = BKTree(sorted(self.words)) if max_distance else None
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+
+    def _limit(self, token):
+        # Short words only match exactly once normalised.
+        if len(token) < 5:
+            return 0
+        return min(self.max_distance, 1 if len(token) < 8 else 2)
+
+    def check_token(self, token):
+        """Blocked word `token` resembles, or None."""
+        cached = self._cache.get(token)
+        if cached is not None:
+            self._cache.move_to_end(token)
+            return cached or None
+        result = None
+        if token.lower() not in self.whitelist:
+            canonical = normalize(token)
+            if (len(canonical) >= self.min_length
+                    and canonical not in self.whitelist):
+                limit = self._limit(canonical)
+                if limit:
+                    result = self.tree.search(canonical, limit)
+                elif is_plain(token):
+                    plain = unmask(token)
+                    result = plain if plain in self.plain_words else None
+                elif canonical in self.words:
+                    result = canonical
+        self._cache[token] = result or ''
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def search(self, text):
+        """First token in `text` that resembles a blocked word, or None."""
+        for match in self._TOKENS.finditer(text):
+            found = self.check_token(match.group())
+            if found:
+                return found
+        return None
@@ -0,0 +1,175 @@
+import asyncio
+import json
+import logging
+import os
+import time
+
+import archive
+from forecast import Forecaster
+from history import NAME_FIELDS, HistoryStore, PageCache
+from stats import StatsEngine
+from tickets import TicketTracker
+from trie import PrefixTrie
+
+logger = logging.getLogger(__name__)
+
+# Matching island/boss/rank within this many seconds counts as a repeat.
+DUPLICATE_WINDOW_SECONDS = 300
+
+
+def _read_json(path):
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _write_json(path, data):
+    with open(path + '.tmp', 'w', encoding='utf-8') as fh:
+        json.dump(data, fh)
+    os.replace(path + '.tmp', path)
+
+
+class GuildState:
+    """Dungeon history, stats and dedup index for a single guild."""
+
+    def __init__(self, guild_id):
+        self.guild_id = guild_id
+        self.history = HistoryStore()
+        self.history_pages = PageCache()
+        self.stats = {'total_spawns': 0, 'rank_counts': {}, 'island_counts': {}}
+        self.stats_engine = StatsEngine()
+        self.forecaster = Forecaster()
+        self.names = {field: PrefixTrie() for field in NAME_FIELDS}
+        self.tickets = TicketTracker()
+        # (island, boss, rank) -> monotonic time of the last alert
+        self.recent_spawns = {}
+        self.last_active = time.monotonic()
+
+    def touch(self):
+        self.last_active = time.monotonic()
+
+    def record_names(self, dungeon_info):
+        for field in NAME_FIELDS:
+            if dungeon_info[field] != 'Unknown':
+                self.names[field].add(dungeon_info[field])
+
+    def recent_spawns_wall(self):
+        """`recent_spawns` as wall-clock times, which survive a restart."""
+        offset = time.time() - time.monotonic()
+        return {key: seen + offset for key, seen in self.recent_spawns.items()}
+
+    def restore_recent_spawns(self, spawns):
+        offset = time.time() - time.monotonic()
+        self.recent_spawns.update(
+            (key, seen - offset) for key, seen in spawns.items())
+
+    def is_duplicate(self, dungeon_info):
+        now = time.monotonic()
+        key = (dungeon_info['island'], dungeon_info['boss'],
+               dungeon_info['rank'])
+        seen = self.recent_spawns.get(key)
+        return seen is not None and now - seen < DUPLICATE_WINDOW_SECONDS
+
+    def remember(self, dungeon_info):
+        now = time.monotonic()
+        if len(self.recent_spawns) > 256:
+            self.recent_spawns = {
+                key: seen
+                for key, seen in self.recent_spawns.items()
+                if now - seen < DUPLICATE_WINDOW_SECONDS
+            }
+        key = (dungeon_info['island'], dungeon_info['boss'],
+               dungeon_info['rank'])
+        self.recent_spawns[key] = now
+
+
+class GuildRegistry:
+    """Lazily loaded per-guild states, archived to disk once idle."""
+
+    def __init__(self, state_dir):
+        self.state_dir = state_dir
+        self.states = {}
+        self._loading = {}
+
+    def __iter__(self):
+        return iter(list(self.states.values()))
+
+    def archive_path(self, guild_id):
+        return os.path.join(self.state_dir, 'guilds', f"{guild_id}.npz")
+
+    def tickets_path(self, guild_id):
+        return os.path.join(self.state_dir, 'guilds',
+                            f"{guild_id}.tickets.json")
+
+    def peek(self, guild_id):
+        return self.states.get(guild_id)
+
+    async def get(self, guild_id):
+        """State for `guild_id`, restoring an idle archive on first use."""
+        state = self.states.get(guild_id)
+        if state is not None:
+            state.touch()
+            return state
+        pending = self._loading.get(guild_id)
+        if pending is None:
+            pending = self._loading[guild_id] = asyncio.ensure_future(
+                self._load(guild_id))
+        try:
+            state = await asyncio.shield(pending)
+        finally:
+            self._loading.pop(guild_id, None)
+        state.touch()
+        return state
+
+    async def _load(self, guild_id):
+        state = GuildState(guild_id)
+        path = self.archive_path(guild_id)
+        if os.path.exists(path):
+            try:
+                rows = await asyncio.to_thread(archive.import_history, path,
+                                               state)
+                logger.info("Restored %s spawns for guild %s", rows, guild_id)
+            except Exception as e:
+                logger.error("Error restoring guild %s: %s", guild_id, e)
+        path = self.tickets_path(guild_id)
+        if os.path.exists(path):
+            try:
+                state.tickets.restore(await asyncio.to_thread(_read_json, path))
+            except Exception as e:
+                logger.error("Error restoring tickets for guild %s: %s",
+                             guild_id, e)
+        self.states[guild_id] = state
+        return state
+
+    async def evict_idle(self, idle_seconds):
+        """Archive and drop guilds with no events for `idle_seconds`."""
+        now = time.monotonic()
+        for state in self:
+            if now - state.last_active < idle_seconds:
+                continue
+            if state.tickets.open:
+                continue  # open tickets aren't archived
+            records = list(state.history)
+            tickets = state.tickets.snapshot()
+            if records and archive.np is None:
+                continue  # can't archive, keep it in memory instead
+            path = self.archive_path(state.guild_id)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                if records:
+                    await asyncio.to_thread(archive.export_history, records,
+                                            path + '.tmp')
+                    os.replace(path + '.tmp', path)
+                # The archive only holds history; ticket metrics go alongside.
+                await asyncio.to_thread(_write_json,
+                                        self.tickets_path(state.guild_id),
+                                        tickets)
+            except Exception as e:
+                logger.error("Error archiving guild %s: %s", state.guild_id,
+                             e)
+                continue
+            # Spawns or ticket changes during the export aren't saved.
+            if (time.monotonic() - state.last_active >= idle_seconds
+                    and len(state.history) == len(records)
+                    and state.tickets.snapshot() == tickets):
+                self.states.pop(state.guild_id, None)
+                logger.info("Evicted idle guild %s", state.guild_id)
@@ -0,0 +1,206 @@
+import bisect
+import heapq
+from array import array
+from collections import OrderedDict
+
+# Fields with a secondary index; each maps a value to the positions of the
+# matching records in insertion order.
+INDEXED_FIELDS = ('rank', 'island', 'boss')
+# Spawn fields offered as slash-command autocomplete.
+NAME_FIELDS = ('island', 'map', 'boss')
+
+
+def _index_key(field, value):
+    return value.upper() if field == 'rank' else value.lower()
+
+
+def _timestamp(record):
+    return record['timestamp']
+
+
+class HistoryStore:
+    """Dungeon history in timestamp order with per-field secondary indexes.
+
+    Behaves like the plain list it replaces (append, len, slicing), and
+    adds filtered, paginated queries newest-first. Live spawns arrive in
+    order and are appended; older imported batches go through
+    `merge_indexed` so positions stay in timestamp order.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.indexes = {field: {} for field in INDEXED_FIELDS}
+
+    def __len__(self):
+        return len(self.records)
+
+    def __bool__(self):
+        return bool(self.records)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __getitem__(self, item):
+        return self.records[item]
+
+    def append(self, record):
+        position = len(self.records)
+        self.records.append(record)
+        for field in INDEXED_FIELDS:
+            key = _index_key(field, record[field])
+            positions = self.indexes[field].get(key)
+            if positions is None:
+                positions = self.indexes[field][key] = array('q')
+            positions.append(position)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def extend_indexed(self, records, positions):
+        """Append records whose index positions were grouped up front.
+
+        ``positions`` maps each indexed field to ``{value: offsets}``, with
+        offsets relative to the first appended record.
+        """
+        base = len(self.records)
+        self.records.extend(records)
+        for field in INDEXED_FIELDS:
+            grouped = {}
+            for value, offsets in positions[field].items():
+                grouped.setdefault(_index_key(field, value), []).append(offsets)
+            index = self.indexes[field]
+            for key, groups in grouped.items():
+                offsets = groups[0] if len(groups) == 1 else sorted(
+                    offset for group in groups for offset in group)
+                existing = index.get(key)
+                if existing is None:
+                    existing = index[key] = array('q')
+                existing.extend(base + int(offset) for offset in offsets)
+
+    def truncate(self, length):
+        """Drop and return the records from position `length` on."""
+        tail = self.records[length:]
+        if not tail:
+            return tail
+        del self.records[length:]
+        for index in self.indexes.values():
+            for key in list(index):
+                positions = index[key]
+                del positions[bisect.bisect_left(positions, length):]
+                if not positions:
+                    del index[key]
+        return tail
+
+    def merge_indexed(self, records, positions):
+        """`extend_indexed` for a timestamp-sorted batch of any age.
+
+        Records newer than the batch's first are lifted off and merged back
+        in order. Batch rows older than all of them keep their grouped
+        positions; only the interleaved rest is appended one by one, which
+        is nothing in the usual case of importing older history.
+        """
+        if not records:
+            return
+        split = bisect.bisect_right(self.records,
+                                    _timestamp(records[0]),
+                                    key=_timestamp)
+        tail = self.truncate(split)
+        if not tail:
+            self.extend_indexed(records, positions)
+            return
+        cut = bisect.bisect_right(records, _timestamp(tail[0]), key=_timestamp)
+        head = {}
+        for field, grouped in positions.items():
+            head[field] = {}
+            for value, offsets in grouped.items():
+                offsets = offsets[:bisect.bisect_left(offsets, cut)]
+                if len(offsets):
+                    head[field][value] = offsets
+        self.extend_indexed(records[:cut], head)
+        self.extend(heapq.merge(records[cut:], tail, key=_timestamp))
+
+    def values(self, field):
+        return self.indexes[field].keys()
+
+    def _candidates(self, filters):
+        """Smallest index list covering the filters, or None for all."""
+        best = None
+        for field, value in filters.items():
+            positions = self.indexes[field].get(_index_key(field, value))
+            if positions is None:
+                return array('q')
+            if best is None or len(positions) < len(best):
+                best = positions
+        return best
+
+    def _matches(self, record, filters):
+        return all(
+            _index_key(field, record[field]) == _index_key(field, value)
+            for field, value in filters.items())
+
+    def count(self, filters):
+        """Number of matching records; exact and O(1) for a single filter."""
+        candidates = self._candidates(filters)
+        if candidates is None:
+            return len(self.records)
+        if len(filters) == 1:
+            return len(candidates)
+        return sum(1 for position in candidates
+                   if self._matches(self.records[position], filters))
+
+    def page(self, filters, page, page_size):
+        """Records for 1-based `page`, newest first."""
+        candidates = self._candidates(filters)
+        start = (page - 1) * page_size
+        if candidates is None:
+            end = len(self.records) - start
+            return [
+                self.records[position]
+                for position in range(end - 1, max(end - page_size, 0) - 1, -1)
+            ]
+        if len(filters) == 1:
+            end = len(candidates) - start
+            return [
+                self.records[candidates[i]]
+                for i in range(end - 1, max(end - page_size, 0) - 1, -1)
+            ]
+        result = []
+        skipped = 0
+        for i in range(len(candidates) - 1, -1, -1):
+            record = self.records[candidates[i]]
+            if not self._matches(record, filters):
+                continue
+            if skipped < start:
+                skipped += 1
+                continue
+            result.append(record)
+            if len(result) == page_size:
+                break
+        return result
+
+    def version(self, filters):
+        """Changes whenever the result set for `filters` changes."""
+        candidates = self._candidates(filters)
+        if candidates is None or len(filters) != 1:
+            return len(self.records)
+        return len(candidates)
+
+
+class PageCache:
+    """Small LRU cache of rendered history pages."""
+
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get_or_render(self, key, render):
+        value = self.entries.get(key)
+        if value is not None:
+            self.entries.move_to_end(key)
+            return value
+        value = render()
+        self.entries[key] = value
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+        return value
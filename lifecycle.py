@@ -0,0 +1,100 @@
+import asyncio
+import logging
+import signal
+
+logger = logging.getLogger(__name__)
+
+
+class Outbox:
+    """Ordered queue for outgoing channel sends, drained on shutdown.
+
+    Alerts are queued instead of awaited so that a slow or rate-limited
+    send never holds up detection, and so shutdown knows what is still
+    in flight.
+    """
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.worker = None
+        self.closed = False
+
+    def __len__(self):
+        return self.queue.qsize()
+
+    def send(self, channel, **kwargs):
+        """Queue `channel.send(**kwargs)`; False once shutdown has begun."""
+        if self.closed or channel is None:
+            return False
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.ensure_future(self._run())
+        self.queue.put_nowait((channel, kwargs))
+        return True
+
+    async def _run(self):
+        while True:
+            channel, kwargs = await self.queue.get()
+            try:
+                await channel.send(**kwargs)
+            except Exception as e:
+                logger.error("Error sending queued message: %s", e)
+            finally:
+                self.queue.task_done()
+
+    async def drain(self, timeout):
+        """Stop accepting sends and flush the queue for up to `timeout`."""
+        self.closed = True
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("Shutdown deadline hit with %s sends still queued",
+                           len(self))
+        finally:
+            if self.worker is not None:
+                self.worker.cancel()
+
+
+class Lifecycle:
+    """Runs registered shutdown hooks once on SIGTERM/SIGINT.
+
+    Hooks run in registration order and share one overall deadline; a hook
+    that fails or times out is logged and the rest still run.
+    """
+
+    def __init__(self, deadline=20.0):
+        self.deadline = deadline
+        self.hooks = []
+        self.stopping = False
+        self._task = None
+
+    def on_shutdown(self, hook):
+        self.hooks.append(hook)
+        return hook
+
+    def install(self):
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.request_shutdown, sig)
+            except (NotImplementedError, RuntimeError):
+                pass  # no signal handlers outside the main thread / on Windows
+
+    def request_shutdown(self, sig=None):
+        if self.stopping:
+            return
+        self.stopping = True
+        if sig is not None:
+            logger.info("Received %s, shutting down", signal.Signals(sig).name)
+        self._task = asyncio.ensure_future(self.shutdown())
+
+    async def shutdown(self):
+        self.stopping = True
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        for hook in self.hooks:
+            remaining = max(deadline - loop.time(), 1.0)
+            try:
+                await asyncio.wait_for(hook(), remaining)
+            except asyncio.TimeoutError:
+                logger.error("Shutdown hook %s timed out", hook.__name__)
+            except Exception as e:
+                logger.error("Error in shutdown hook %s: %s", hook.__name__, e)
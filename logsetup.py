@@ -0,0 +1,125 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+_STANDARD_ATTRS = set(
+    vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {
+        'message', 'asctime', 'taskName'
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra` fields as top-level keys."""
+
+    def format(self, record):
+        entry = {
+            'time':
+            datetime.fromtimestamp(record.created,
+                                   timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _STANDARD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Thin out known-noisy INFO/DEBUG records; everything else passes.
+
+    Only records whose unformatted template is in `templates` are
+    sampled, so one-off events are never lost and the check never formats
+    a message. Each template passes `burst` records per `interval`
+    seconds and then one in `every`. The next record that passes carries
+    the number dropped since as ``suppressed``.
+    """
+
+    def __init__(self, templates=(), burst=5, interval=60, every=100):
+        super().__init__()
+        self.templates = frozenset(templates)
+        self.burst = burst
+        self.interval = interval
+        self.every = every
+        # template -> [window_start, seen, suppressed]
+        self.counters = {}
+
+    def filter(self, record):
+        if (record.levelno >= logging.WARNING
+                or record.msg not in self.templates):
+            return True
+        now = time.monotonic()
+        counter = self.counters.get(record.msg)
+        if counter is None or now - counter[0] >= self.interval:
+            suppressed = counter[2] if counter else 0
+            counter = self.counters[record.msg] = [now, 0, suppressed]
+        counter[1] += 1
+        seen = counter[1]
+        if seen > self.burst and (seen - self.burst) % self.every:
+            counter[2] += 1
+            return False
+        if counter[2]:
+            record.suppressed = counter[2]
+            counter[2] = 0
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that leaves formatting to the listener thread.
+
+    The stock handler merges ``msg % args`` before enqueueing, which puts
+    the formatting cost back on the caller. Log arguments here are plain
+    values that aren't mutated afterwards, so the record is queued as is.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+_listener = None
+
+
+def setup(level='INFO', json_output=True, sample_templates=(), burst=5,
+          interval=60, every=100, stream=None):
+    """Route all logging through a queue to a background writer thread."""
+    global _listener
+    if _listener is not None:
+        return _listener
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(
+        JsonFormatter() if json_output else logging.Formatter(
+            '%(asctime)s - %(levelname)s - %(message)s'))
+    records = queue.SimpleQueue()
+    handler = LazyQueueHandler(records)
+    handler.addFilter(
+        SamplingFilter(sample_templates, burst, interval, every))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(records,
+                                               output,
+                                               respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown)
+    return _listener
+
+
+def shutdown():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
@@ -1,62 +1,66 @@
 import os
 import discord
-from discord.ext import commands
+from discord import app_commands
+from discord.ext import tasks
 from datetime import datetime
 import json
 import asyncio
 import logging
 import re
+import tempfile
+import time
 
 from keep_alive import keep_alive
 from discord.ui import View, Button
+from stats import StatsEngine
+from guilds import GuildRegistry
+from tickets import TICKET_TYPES
+import archive
+import automod
+import config
+import detection
+import lifecycle
+import logsetup
+import snapshot
 
 keep_alive()
-# Configure logging
-logging.basicConfig(level=logging.INFO,
-                    format='%(asctime)s - %(levelname)s - %(message)s')
+# Log records are queued and written as JSON by a background thread
+logsetup.setup(**config.current()['logging'])
 logger = logging.getLogger(__name__)
 
 TOKEN = os.getenv("BOT_TOKEN")
-GENERAL_CHANNEL_ID = int(os.getenv("GENERAL_CHANNEL_ID"))
-PING_CHANNEL_ID = int(os.getenv("PING_CHANNEL_ID"))
 
 # needed for categories and roles
 
-bot = commands.Bot(command_prefix='/', intents=discord.Intents.all())
-
-# Configuration
-CONFIG = {
-    'colors': {
-        'E': 0x808080,
-        'D': 0x8B4513,
-        'C': 0x00FF00,
-        'B': 0x0000FF,
-        'A': 0x800080,
-        'S': 0xFF4500,
-        'SS': 0xFF0000
-    },
-    'role_mentions': {
-        'S': 1366005331758682289,
-        'SS': 1366005331758682288
-    },
-    'cooldown_seconds': 5,
-    'max_dungeons_per_hour': 10,
-
-    # ===== TICKET CONFIG =====
-    'ticket': {
-        'category_id':
-        1366005332492550195,  # Replace with your ticket category ID
-        'log_channel_id':
-        1378594826672541764,  # Replace with your log channel ID (optional)
-        'staff_role_id': 1366005331809013943  # Replace with your staff role ID
-    }
-}
+class DungeonBot(discord.Client):
+    """Client with an application command tree synced on startup"""
+
+    def __init__(self):
+        super().__init__(intents=discord.Intents.all())
+        self.tree = app_commands.CommandTree(self)
+
+    async def setup_hook(self):
+        synced = await self.tree.sync()
+        logger.info("Synced %s application commands", len(synced))
+
+
+bot = DungeonBot()
+
+# Channel/role IDs and the automod word list live in config.json and are
+# hot-reloaded; see config.py for the built-in defaults.
 
-dungeon_history = []
+# Dungeon history, stats and dedup are partitioned per guild
+guild_states = GuildRegistry(config.current()['state_dir'])
 user_preferences = {}
-dungeon_stats = {'total_spawns': 0, 'rank_counts': {}, 'island_counts': {}}
 last_alert_time = {}
 
+# Alert sends are queued so shutdown can drain them before exiting
+outbox = lifecycle.Outbox()
+# Serialises snapshot writes; a later save waits for one in flight
+snapshot_lock = asyncio.Lock()
+bot_lifecycle = lifecycle.Lifecycle(
+    config.current()['shutdown']['deadline_seconds'])
+
 ##############################
 # Dungeon Bot functions below (unchanged from your code)
 ##############################
@@ -64,14 +68,29 @@ last_alert_time = {}
 
 @bot.event
 async def on_ready():
-    logger.info(f'Bot is now running as {bot.user}')
-    logger.info(f'Bot ID: {bot.user.id}')
-    logger.info(f'Connected to {len(bot.guilds)} guilds')
-   
+    logger.info('Bot is now running as %s', bot.user)
+    logger.info('Bot ID: %s', bot.user.id)
+    logger.info('Connected to %s guilds', len(bot.guilds))
+    if not forecast_prealerts.is_running():
+        forecast_prealerts.start()
+    if not config_watcher.is_running():
+        config_watcher.start()
+    if not evict_idle_guilds.is_running():
+        evict_idle_guilds.start()
+    if not flush_violations.is_running():
+        flush_violations.start()
+    if not snapshot_state.is_running():
+        snapshot_state.start()
 
 
 def get_rank_color(rank):
-    return CONFIG['colors'].get(rank.upper(), 0x5865F2)
+    return config.current()['colors'].get(rank.upper(), 0x5865F2)
+
+
+def format_role_mentions(role_ids):
+    if isinstance(role_ids, int):
+        role_ids = [role_ids]
+    return ' '.join(f"<@&{role_id}>" for role_id in role_ids or ())
 
 
 def parse_dungeon_info(message_content):
@@ -107,25 +126,15 @@ def parse_dungeon_info(message_content):
 
         return dungeon_data
     except Exception as e:
-        logger.error(f"Error parsing dungeon info: {e}")
+        logger.error("Error parsing dungeon info: %s", e)
         return None
 
 
-def is_duplicate_dungeon(dungeon_info):
+def is_duplicate_dungeon(state, dungeon_info):
     try:
-        current_time = datetime.now()
-        for historical_dungeon in dungeon_history[-20:]:
-            time_diff = (current_time -
-                         historical_dungeon['timestamp']).total_seconds()
-            if time_diff < 300:
-                if (historical_dungeon['island'] == dungeon_info['island']
-                        and historical_dungeon['boss'] == dungeon_info['boss']
-                        and historical_dungeon['rank']
-                        == dungeon_info['rank']):
-                    return True
-        return False
+        return state.is_duplicate(dungeon_info)
     except Exception as e:
-        logger.error(f"Error checking duplicate: {e}")
+        logger.error("Error checking duplicate: %s", e)
         return False
 
 
@@ -141,12 +150,13 @@ def should_alert_user(user_id, dungeon_info):
                 return False
         return True
     except Exception as e:
-        logger.error(f"Error checking user preferences: {e}")
+        logger.error("Error checking user preferences: %s", e)
         return True
 
 
-def update_statistics(dungeon_info):
+def update_statistics(state, dungeon_info):
     try:
+        dungeon_stats = state.stats
         dungeon_stats['total_spawns'] += 1
         rank = dungeon_info['rank'].upper()
         dungeon_stats['rank_counts'][rank] = dungeon_stats['rank_counts'].get(
@@ -154,8 +164,11 @@ def update_statistics(dungeon_info):
         island = dungeon_info['island']
         dungeon_stats['island_counts'][
             island] = dungeon_stats['island_counts'].get(island, 0) + 1
+        state.stats_engine.record(dungeon_info)
+        state.forecaster.record(dungeon_info)
+        state.record_names(dungeon_info)
     except Exception as e:
-        logger.error(f"Error updating statistics: {e}")
+        logger.error("Error updating statistics: %s", e)
 
 
 def check_rate_limit(user_id):
@@ -164,12 +177,12 @@ def check_rate_limit(user_id):
         if user_id in last_alert_time:
             time_diff = (current_time -
                          last_alert_time[user_id]).total_seconds()
-            if time_diff < CONFIG['cooldown_seconds']:
+            if time_diff < config.current()['cooldown_seconds']:
                 return False
         last_alert_time[user_id] = current_time
         return True
     except Exception as e:
-        logger.error(f"Error checking rate limit: {e}")
+        logger.error("Error checking rate limit: %s", e)
         return True
 
 
@@ -209,91 +222,172 @@ async def create_dungeon_embed(dungeon_info, message_time=None):
 
         return embed
     except Exception as e:
-        logger.error(f"Error creating embed: {e}")
+        logger.error("Error creating embed: %s", e)
         return None
 
 
-@bot.event
-async def on_message(message):
-    try:
-        if message.author == bot.user:
-            return
-        # ✅ Dungeon detection starts here
-        if message.channel.id == GENERAL_CHANNEL_ID:
-            msg_channel = bot.get_channel(GENERAL_CHANNEL_ID)
-            ping_channel = bot.get_channel(PING_CHANNEL_ID)
-            if not ping_channel:
-                logger.error("Ping channel not found")
-                return
-
-            content_lower = message.content.lower()
-            has_dungeon_indicators = ("spawned" in content_lower
-                                      or ("🌍" in message.content
-                                          and "🗺️" in message.content
-                                          and "👹" in message.content))
-
-            if has_dungeon_indicators:
-                dungeon_info = parse_dungeon_info(message.content)
-                if not dungeon_info:
-                    logger.warning("Failed to parse dungeon info")
-                    return
-
-                if is_duplicate_dungeon(dungeon_info):
-                    logger.info("Duplicate dungeon detected, skipping")
-                    return
-
-                update_statistics(dungeon_info)
-
-                dungeon_history.append({
-                    **dungeon_info, 'timestamp':
-                    datetime.now(),
-                    'message_id':
-                    message.id
-                })
+def is_incomplete_dungeon(dungeon_info):
+    return dungeon_info['island'] == 'Unknown' and dungeon_info[
+        'boss'] == 'Unknown'
 
-                embed = await create_dungeon_embed(dungeon_info,
-                                                   message.created_at)
-                if not embed:
-                    logger.error("Failed to create embed")
-                    return
 
-                mention_text = f"<@&{1366005331758682291}>\n"
+async def handle_dungeon_text(text, context, final):
+    """Parse a settled announcer message and send its alert"""
+    try:
+        content_lower = text.lower()
+        has_dungeon_indicators = ("spawned" in content_lower
+                                  or ("🌍" in text and "🗺️" in text
+                                      and "👹" in text))
+        if not has_dungeon_indicators:
+            return detection.IGNORED
+
+        settings = config.current().for_guild(context['guild_id'])
+        msg_channel = bot.get_channel(settings.channel('general'))
+        ping_channel = bot.get_channel(settings.channel('ping'))
+        if not ping_channel:
+            logger.error("Ping channel not found",
+                         extra={'guild': context['guild_id']})
+            return detection.IGNORED
+
+        dungeon_info = parse_dungeon_info(text)
+        if not dungeon_info:
+            logger.warning("Failed to parse dungeon info")
+            return detection.IGNORED
+
+        if is_incomplete_dungeon(dungeon_info) and not final:
+            return detection.INCOMPLETE
+
+        state = await guild_states.get(context['guild_id'])
+        if is_duplicate_dungeon(state, dungeon_info):
+            logger.info("Duplicate dungeon detected, skipping",
+                        extra={
+                            'guild': context['guild_id'],
+                            'rank': dungeon_info['rank'].upper()
+                        })
+            return detection.ALERTED
+
+        state.remember(dungeon_info)
+        update_statistics(state, dungeon_info)
+
+        state.history.append({
+            **dungeon_info, 'timestamp': datetime.now(),
+            'message_id': context['message_id']
+        })
+
+        embed = await create_dungeon_embed(dungeon_info,
+                                           context['created_at'])
+        if not embed:
+            logger.error("Failed to create embed")
+            return detection.ALERTED
+
+        mention_text = f"<@&{settings.role('dungeon')}>\n"
 
-                rank = dungeon_info['rank'].upper()
-                is_red = dungeon_info['red_dungeon'].lower() == 'yes'
-                is_double = dungeon_info['double_dungeon'].lower() == 'yes'
+        rank = dungeon_info['rank'].upper()
+        is_red = dungeon_info['red_dungeon'].lower() == 'yes'
+        is_double = dungeon_info['double_dungeon'].lower() == 'yes'
+
+        if rank == "S" and "S" in settings['role_mentions']:
+            role = settings['role_mentions']['S']
+            mention_text += f"<@&{role}>\n" if isinstance(role,
+                                                           int) else f"{role}\n"
+
+        if rank == "SS" and "SS" in settings['role_mentions']:
+            role = settings['role_mentions']['SS']
+            mention_text += f"<@&{role}>\n" if isinstance(role,
+                                                           int) else f"{role}\n"
+
+        if is_red:
+            mention_text += f"🔥 <@&{settings.role('red_dungeon')}>\n"
+
+        if is_double:
+            mention_text += f"⚔️<@&{settings.role('double_dungeon')}>\n"
+
+        if msg_channel:
+            outbox.send(msg_channel, content="Embed sent to Dungeon channel")
+        outbox.send(ping_channel, content=mention_text or None, embed=embed)
+
+        logger.info("Sent dungeon alert for %s rank dungeon on %s",
+                    rank,
+                    dungeon_info['island'],
+                    extra={
+                        'guild': context['guild_id'],
+                        'channel': ping_channel.id,
+                        'rank': rank,
+                        'latency': (discord.utils.utcnow() -
+                                    context['created_at']).total_seconds()
+                    })
+        return detection.ALERTED
+    except Exception as e:
+        logger.error("Error handling dungeon message: %s", e)
+        return detection.IGNORED
 
-                if rank == "S" and "S" in CONFIG['role_mentions']:
-                    role = CONFIG['role_mentions']['S']
-                    mention_text += f"<@&{role}>\n" if isinstance(
-                        role, int) else f"{role}\n"
 
-                if rank == "SS" and "SS" in CONFIG['role_mentions']:
-                    role = CONFIG['role_mentions']['SS']
-                    mention_text += f"<@&{role}>\n" if isinstance(
-                        role, int) else f"{role}\n"
+dungeon_detection = detection.DetectionPipeline(
+    handle_dungeon_text,
+    debounce_seconds=config.current()['detection']['debounce_seconds'],
+    late_embed_seconds=config.current()['detection']['late_embed_seconds'])
 
-                if is_red:
-                    mention_text += f"🔥 <@&{1366005331758682290}>\n"
 
-                if is_double:
-                    mention_text += f"⚔️<@&{1366005331758682286}>\n"
+@bot.event
+async def on_message(message):
+    try:
+        if message.author == bot.user:
+            return
+        # Slash commands arrive as interactions, so plain messages only
+        # need automod and dungeon detection.
+        if message.guild is None:
+            return
+        settings = config.current().for_guild(message.guild.id)
+        if await automod.check_flood(bot, message, settings):
+            return
+        if await automod.check_message(bot, message, settings):
+            return
+        state = guild_states.peek(message.guild.id)
+        if state is not None and message.channel.id in state.tickets.open:
+            record_ticket_response(state, message, settings)
+        # ✅ Dungeon detection starts here
+        if message.channel.id == settings.channel('general'):
+            dungeon_detection.submit(
+                message.id, detection.message_text(message.content,
+                                                   message.embeds),
+                {
+                    'guild_id': message.guild.id,
+                    'message_id': message.id,
+                    'created_at': message.created_at
+                })
+    except Exception as e:
+        logger.error("Error in on_message: %s", e)
 
-                await msg_channel.send("Embed sent to Dungeon channel")
-                await ping_channel.send(content=mention_text or None,
-                                        embed=embed)
 
-                logger.info(
-                    f"Sent dungeon alert for {rank} rank dungeon on {dungeon_info['island']}"
-                )
+@bot.event
+async def on_raw_message_edit(payload):
+    """Re-run detection when an announcer edits or adds embeds"""
+    try:
+        if payload.guild_id is None or payload.channel_id != config.current(
+        ).for_guild(payload.guild_id).channel('general'):
+            return
+        data = payload.data
+        cached = payload.cached_message
+        author_id = data.get('author', {}).get('id')
+        if author_id is not None and int(author_id) == bot.user.id:
+            return
+        if 'content' not in data and 'embeds' not in data and cached is None:
+            return
+        content = data.get('content',
+                           cached.content if cached else '')
+        embeds = data.get('embeds', cached.embeds if cached else [])
+        dungeon_detection.submit(
+            payload.message_id, detection.message_text(content, embeds), {
+                'guild_id': payload.guild_id,
+                'message_id': payload.message_id,
+                'created_at': discord.utils.snowflake_time(payload.message_id)
+            })
     except Exception as e:
-        logger.error(f"Error in on_message: {e}")
-
-    await bot.process_commands(message)
+        logger.error("Error in on_raw_message_edit: %s", e)
 
 
-@bot.command(name='commands')
-async def help_command(ctx):
+@bot.tree.command(name='commands', description="Show help information")
+async def help_command(interaction: discord.Interaction):
     """Show help information"""
     try:
         embed = discord.Embed(title="🤖 Dungeon Bot Commands",
@@ -310,20 +404,32 @@ async def help_command(ctx):
         `/preferences view`
         View your current preferences
 
-        `/stats`
-        View dungeon spawn statistics
+        `/stats [all|1h|24h]`
+        View dungeon spawn statistics and spawn rates
 
-        `/history [count]`
-        View recent dungeon history (default: 5)
+        `/forecast [rank|island]`
+        Forecast the next spawn (default: S and SS)
 
-        `/pingdungeon <island> <world>`
-        Create a custom dungeon alert
+        `/history [count] [rank] [island] [boss]`
+        Browse dungeon history, optionally filtered (default: 5 per page)
+
+        `/pdg <island> <world>`
+        Create a custom dungeon alert (island/world autocomplete)
 
         `/bossalert <island> <world> <boss>`
         Use for boss alerts
 
-        `/ticketpanel`
-        (Admin) Post the ticket creation panel
+        `/ticketpannel` / `/ticketpguild` / `/ttpannel`
+        (Admin) Post a ticket creation panel
+
+        `/ticketstats`
+        (Admin) Open tickets, staff load and median first-response time
+
+        `/reloadconfig`
+        (Admin) Reload config.json and the automod word list
+
+        `/exporthistory` / `/importhistory <file>`
+        (Admin) Export or bulk-import dungeon history
         """
 
         embed.add_field(name="📋 Commands", value=commands_text, inline=False)
@@ -331,10 +437,11 @@ async def help_command(ctx):
                         value="E, D, C, B, A, S, SS",
                         inline=False)
 
-        await ctx.send(embed=embed)
+        await interaction.response.send_message(embed=embed)
     except Exception as e:
-        logger.error(f"Error in help command: {e}")
-        await ctx.send("❌ Error displaying help information.")
+        logger.error("Error in help command: %s", e)
+        await interaction.response.send_message(
+            "❌ Error displaying help information.", ephemeral=True)
 
 
 ##############################
@@ -342,9 +449,11 @@ async def help_command(ctx):
 ##############################
 
 
-@bot.command(name="ticketpguild")
-@commands.has_permissions(administrator=True)
-async def ticket_p_guild(ctx):
+@bot.tree.command(name="ticketpguild", description="Post the guild application ticket panel")
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def ticket_p_guild(interaction: discord.Interaction):
     view = View()
     view.add_item(
         Button(label="🎟 Apply for Guild",
@@ -355,7 +464,7 @@ async def ticket_p_guild(ctx):
         title="Guild Joining Ticket",
         description=
         ("# Open Ticket For Joining the Guild:\n"
-         "Please make sure to carefully read the guidelines in <#1366005332270387280>.\n"
+         f"Please make sure to carefully read the guidelines in <#{config.current().for_guild(interaction.guild_id).channel('guild_rules')}>.\n"
          "Ensure you meet all the requirements listed before opening a ticket.\n"
          "To open a ticket, simply click the **button attached** to this message.\n"
          "Our team will assist you as soon as possible.\n"
@@ -366,12 +475,16 @@ async def ticket_p_guild(ctx):
         url=
         "https://media.discordapp.net/attachments/1378594850383069235/1379694254393266227/image.png"
     )
-    await ctx.send(embed=embed, view=view)
+    await interaction.channel.send(embed=embed, view=view)
+    await interaction.response.send_message("✅ Panel posted.",
+                                            ephemeral=True)
 
 
-@bot.command(name="ticketpannel")
-@commands.has_permissions(administrator=True)
-async def ticket_pannel(ctx):
+@bot.tree.command(name="ticketpannel", description="Post the support ticket panel")
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def ticket_pannel(interaction: discord.Interaction):
     view = View()
     view.add_item(
         Button(label="🎟 Open Ticket",
@@ -391,12 +504,16 @@ async def ticket_pannel(ctx):
         url=
         "https://media.discordapp.net/attachments/1378594850383069235/1379694254393266227/image.png"
     )
-    await ctx.send(embed=embed, view=view)
+    await interaction.channel.send(embed=embed, view=view)
+    await interaction.response.send_message("✅ Panel posted.",
+                                            ephemeral=True)
 
 
-@bot.command(name="ttpannel")
-@commands.has_permissions(administrator=True)
-async def t_t_pannel(ctx):
+@bot.tree.command(name="ttpannel", description="Post the therapy ticket panel")
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def t_t_pannel(interaction: discord.Interaction):
     view = View()
     view.add_item(
         Button(label="🎟 Appoint Your Therapy Now",
@@ -407,7 +524,7 @@ async def t_t_pannel(ctx):
         title="Therapy Section",
         description=
         ("If you are having any mental health issues or something similar, please click the button attached to "
-         "this message to open a support ticket. <@&1371118384179318795> will help you solve your problem as soon "
+         f"this message to open a support ticket. {format_role_mentions(config.current().for_guild(interaction.guild_id).role('therapist'))} will help you solve your problem as soon "
          "as possible. Please don’t leave your ticket empty. Thank you for being a part of our community!"
          ),
         color=0x2ECC71)
@@ -416,23 +533,140 @@ async def t_t_pannel(ctx):
         url=
         "https://media.discordapp.net/attachments/1378594850383069235/1379694254393266227/image.png"
     )
-    await ctx.send(embed=embed, view=view)
+    await interaction.channel.send(embed=embed, view=view)
+    await interaction.response.send_message("✅ Panel posted.",
+                                            ephemeral=True)
+
+
+@bot.tree.command(name="ticketstats",
+                  description="Show ticket queue and response statistics")
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def ticket_stats_command(interaction: discord.Interaction):
+    """Show open tickets, staff load and time to first response"""
+    try:
+        tickets = (await guild_states.get(interaction.guild_id)).tickets
+        summary = tickets.summary()
+        embed = discord.Embed(title="🎫 Ticket Statistics", color=0x3498DB)
+        embed.add_field(
+            name="Queue",
+            value=(f"Open: {summary['open']}\n"
+                   f"Awaiting staff: {summary['unanswered']}\n"
+                   f"Opened/closed: {summary['opened_total']}/{summary['closed_total']}"
+                   ),
+            inline=True)
+        if summary['longest_wait'] is not None:
+            embed.add_field(name="Longest Wait",
+                            value=format_duration(summary['longest_wait']),
+                            inline=True)
+
+        if summary['median_response'] is None:
+            response_text = "No responses yet."
+        else:
+            response_text = '\n'.join(
+                [f"All: {format_duration(summary['median_response'])} "
+                 f"({summary['responses']} tickets)"] + [
+                     f"{ticket_type.title()}: {format_duration(median)}"
+                     for ticket_type, median in
+                     summary['type_median_response'].items()
+                 ])
+        embed.add_field(name="Median First Response",
+                        value=response_text,
+                        inline=False)
+
+        if summary['by_type']:
+            embed.add_field(name="Open by Type",
+                            value='\n'.join([
+                                f"{ticket_type.title()}: {count}"
+                                for ticket_type, count in
+                                summary['by_type'].items()
+                            ]),
+                            inline=True)
+        if summary['by_staff']:
+            embed.add_field(name="Staff Load",
+                            value='\n'.join([
+                                f"<@{staff_id}>: {count}"
+                                for staff_id, count in summary['by_staff'][:10]
+                            ]),
+                            inline=True)
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        logger.error("Error in ticketstats command: %s", e)
+        await interaction.response.send_message(
+            "❌ Error retrieving ticket statistics.", ephemeral=True)
+
+
+# Ticket type -> role pinged and assigned from
+TICKET_ROLES = {
+    'guild': 'guild_applications',
+    'support': 'support',
+    'therapy': 'therapist'
+}
+
+
+def ticket_role_ids(settings, ticket_type):
+    role_ids = settings.role(TICKET_ROLES[ticket_type])
+    if isinstance(role_ids, int):
+        role_ids = [role_ids]
+    return list(role_ids or ())
+
+
+def online_staff(guild, role_ids):
+    """Ids of non-bot members holding any of `role_ids` who are online"""
+    staff = set()
+    for role_id in role_ids:
+        role = guild.get_role(role_id)
+        if role is None:
+            continue
+        staff.update(member.id for member in role.members
+                     if not member.bot
+                     and member.status != discord.Status.offline)
+    return staff
+
+
+def record_ticket_response(state, message, settings):
+    """Count the first staff reply in a ticket channel"""
+    try:
+        ticket = state.tickets.open[message.channel.id]
+        if ticket['responded_at'] is not None or message.author.bot:
+            return
+        if message.author.id == ticket['opener_id']:
+            return
+        staff_roles = set(ticket_role_ids(settings, ticket['type']))
+        if settings['ticket']['staff_role_id'] is not None:
+            staff_roles.add(settings['ticket']['staff_role_id'])
+        if message.author.id == ticket['staff_id'] or any(
+                role.id in staff_roles
+                for role in getattr(message.author, 'roles', ())):
+            state.tickets.respond(message.channel.id)
+    except Exception as e:
+        logger.error("Error recording ticket response: %s", e)
+
+
+@bot.event
+async def on_guild_channel_delete(channel):
+    state = guild_states.peek(channel.guild.id)
+    if state is not None:
+        state.tickets.close_ticket(channel.id)
 
 
 @bot.event
 async def on_interaction(interaction: discord.Interaction):
     if interaction.type == discord.InteractionType.component:
-        custom_id = interaction.data['custom_id']
+        custom_id = interaction.data.get('custom_id')
+        # Other components (history pages) are handled by their views.
+        if custom_id not in TICKET_TYPES and custom_id != "close_ticket":
+            return
         guild = interaction.guild
+        settings = config.current().for_guild(guild.id)
         category = discord.utils.get(guild.categories,
-                                     id=CONFIG['ticket']['category_id'])
-        staff_role = guild.get_role(CONFIG['ticket']['staff_role_id'])
-        log_channel = bot.get_channel(CONFIG['ticket']['log_channel_id'])
-
-        if custom_id in [
-                "open_ticket_guild", "open_ticket_support",
-                "open_ticket_theoro"
-        ]:
+                                     id=settings['ticket']['category_id'])
+        staff_role = guild.get_role(settings['ticket']['staff_role_id'])
+        log_channel = bot.get_channel(settings['ticket']['log_channel_id'])
+
+        if custom_id in TICKET_TYPES:
             # Check if ticket already exists
             existing = discord.utils.get(
                 guild.text_channels,
@@ -442,6 +676,9 @@ async def on_interaction(interaction: discord.Interaction):
                     f"❌ You already have an open ticket: {existing.mention}",
                     ephemeral=True)
                 return
+            # Creating the channel and assigning staff can outlast the
+            # three seconds Discord allows for a first response.
+            await interaction.response.defer(ephemeral=True)
 
             # Channel permissions
             overwrites = {
@@ -450,10 +687,10 @@ async def on_interaction(interaction: discord.Interaction):
                 interaction.user:
                 discord.PermissionOverwrite(read_messages=True,
                                             send_messages=True),
-                staff_role:
-                discord.PermissionOverwrite(read_messages=True,
-                                            send_messages=True)
             }
+            if staff_role is not None:
+                overwrites[staff_role] = discord.PermissionOverwrite(
+                    read_messages=True, send_messages=True)
 
             channel = await guild.create_text_channel(
                 name=f"ticket-{interaction.user.name.lower()}",
@@ -489,30 +726,46 @@ async def on_interaction(interaction: discord.Interaction):
                        style=discord.ButtonStyle.red,
                        custom_id="close_ticket"))
 
+            # Assign the least-loaded online staff member; ping the whole
+            # team only when nobody is online.
+            ticket_type = TICKET_TYPES[custom_id]
+            role_ids = ticket_role_ids(settings, ticket_type)
+            state = await guild_states.get(guild.id)
+            staff_id = state.tickets.open_ticket(
+                channel.id, ticket_type, interaction.user.id,
+                online_staff(guild, role_ids))
+            staff_member = guild.get_member(
+                staff_id) if staff_id is not None else None
+            if staff_member is not None:
+                await channel.set_permissions(staff_member,
+                                              read_messages=True,
+                                              send_messages=True)
+
             await channel.send(content=f"{interaction.user.mention} ",
                                embed=embed)
-            if custom_id == "open_ticket_theoro":
-                await channel.send(content=f"<@&1371118384179318795>",
-                                   view=close_view)
-            elif custom_id == "open_ticket_guild":
+            if staff_member is not None:
                 await channel.send(
-                    content=f"<@&1379102430746378240> <@&1379102625714147438>",
+                    content=
+                    f"{staff_member.mention} has been assigned to this ticket.",
                     view=close_view)
             else:
-                await channel.send(content=f"<@&1379102430746378240> ",
+                await channel.send(content=format_role_mentions(role_ids),
                                    view=close_view)
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"✅ Ticket created: {channel.mention}", ephemeral=True)
 
             if log_channel:
+                assigned = f" (assigned to <@{staff_id}>)" if staff_id else ""
                 await log_channel.send(
-                    f"📩 Ticket opened by {interaction.user.mention} → {channel.mention}"
+                    f"📩 Ticket opened by {interaction.user.mention} → {channel.mention}{assigned}"
                 )
 
         elif custom_id == "close_ticket":
             await interaction.response.send_message(
                 "🛑 Ticket will be closed in 5 seconds...", ephemeral=True)
             await asyncio.sleep(5)
+            (await guild_states.get(guild.id)).tickets.close_ticket(
+                interaction.channel.id)
             if log_channel:
                 await log_channel.send(
                     f"🔒 Ticket closed: {interaction.channel.name} by {interaction.user.mention}"
@@ -520,12 +773,37 @@ async def on_interaction(interaction: discord.Interaction):
             await interaction.channel.delete()
 
 
-@bot.command(name='pdg')
-async def p_d_g(ctx, island: str, world: str, message_time: datetime = None):
+def name_autocomplete(field):
+    """Autocomplete callback serving spawn names seen in the guild"""
+
+    async def autocomplete(interaction: discord.Interaction, current: str):
+        # Typing must not restore an idle guild's archive; no suggestions
+        # until something else has loaded it.
+        state = guild_states.peek(interaction.guild_id)
+        if state is None:
+            return []
+        return [
+            app_commands.Choice(name=name[:100], value=name[:100])
+            for name in state.names[field].complete(current)
+        ]
+
+    return autocomplete
+
+
+@bot.tree.command(name='pdg', description="Create a custom dungeon alert")
+@app_commands.guild_only()
+@app_commands.autocomplete(island=name_autocomplete('island'),
+                           world=name_autocomplete('map'))
+async def p_d_g(interaction: discord.Interaction, island: str, world: str):
     island = island.title()
     world = world.title()
-    ping_channel = bot.get_channel(PING_CHANNEL_ID)
-    mention_text = f"<@&{1366005331758682291}>"
+    settings = config.current().for_guild(interaction.guild_id)
+    ping_channel = bot.get_channel(settings.channel('ping'))
+    if not ping_channel:
+        await interaction.response.send_message("❌ Ping channel not found.",
+                                                ephemeral=True)
+        return
+    mention_text = format_role_mentions(settings.role('dungeon'))
 
     embed = discord.Embed(
         title=f"🎯 NEW DUNGEON ALERT 🌐",
@@ -544,29 +822,38 @@ async def p_d_g(ctx, island: str, world: str, message_time: datetime = None):
     )
     embed.add_field(name="🎮 Community", value=community_text, inline=False)
 
-    time_str = message_time.strftime(
-        "%d/%m/%Y, %H:%M:%S") if message_time else datetime.now().strftime(
-            "%d/%m/%Y, %H:%M:%S")
+    time_str = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
     embed.add_field(name="🕒 Time", value=time_str, inline=False)
 
     embed.set_footer(text="Ascented Guild.")
     embed.set_thumbnail(url="")
-    await ctx.send("Embed sent to Dungeon channel")
-    await ping_channel.send(content=mention_text or None, embed=embed)
-    logger.info(f"Sent dungeon alert for dungeon on {island}")
+    await interaction.response.send_message("Embed sent to Dungeon channel")
+    outbox.send(ping_channel, content=mention_text or None, embed=embed)
+    logger.info("Sent dungeon alert for dungeon on %s",
+                island,
+                extra={
+                    'guild': interaction.guild_id,
+                    'channel': ping_channel.id
+                })
 
 
-@bot.command(name='bossalert')
-async def boss_alert(ctx,
-                     island: str,
-                     world: str,
-                     boss: str,
-                     message_time: datetime = None):
+@bot.tree.command(name='bossalert', description="Send a world boss alert")
+@app_commands.guild_only()
+@app_commands.autocomplete(island=name_autocomplete('island'),
+                           world=name_autocomplete('map'),
+                           boss=name_autocomplete('boss'))
+async def boss_alert(interaction: discord.Interaction, island: str,
+                     world: str, boss: str):
     island = island.title()
     world = world.title()
     boss = boss.title()
-    ping_channel = bot.get_channel(PING_CHANNEL_ID)
-    mention_text = f"<@&{1376068264454651964}>"
+    settings = config.current().for_guild(interaction.guild_id)
+    ping_channel = bot.get_channel(settings.channel('ping'))
+    if not ping_channel:
+        await interaction.response.send_message("❌ Ping channel not found.",
+                                                ephemeral=True)
+        return
+    mention_text = format_role_mentions(settings.role('boss_alert'))
 
     embed = discord.Embed(
         title=f"🎯 NEW DUNGEON ALERT 🌐",
@@ -585,76 +872,95 @@ async def boss_alert(ctx,
     )
     embed.add_field(name="🎮 Community", value=community_text, inline=False)
 
-    time_str = message_time.strftime(
-        "%d/%m/%Y, %H:%M:%S") if message_time else datetime.now().strftime(
-            "%d/%m/%Y, %H:%M:%S")
+    time_str = datetime.now().strftime("%d/%m/%Y, %H:%M:%S")
     embed.add_field(name="🕒 Time", value=time_str, inline=False)
 
     embed.set_footer(text="Ascented Guild.")
     embed.set_thumbnail(url="")
-    await ping_channel.send(content=mention_text or None, embed=embed)
-    logger.info(f"Sent Boss alert on {island}")
+    await interaction.response.send_message("✅ Boss alert sent.",
+                                            ephemeral=True)
+    outbox.send(ping_channel, content=mention_text or None, embed=embed)
+    logger.info("Sent Boss alert on %s",
+                island,
+                extra={
+                    'guild': interaction.guild_id,
+                    'channel': ping_channel.id
+                })
 
 
-@bot.command(name='preferences')
-async def preferences_command(ctx, action=None, setting=None, *, value=None):
-    """Manage user preferences"""
-    try:
-        user_id = ctx.author.id
+preferences_group = app_commands.Group(
+    name='preferences', description="Manage your dungeon alert preferences")
 
-        if action == "view":
-            prefs = user_preferences.get(user_id, {})
-            if not prefs:
-                await ctx.send(
-                    "You have no preferences set. Use `!commands` to see available options."
-                )
-                return
 
-            embed = discord.Embed(title="Your Preferences", color=0x5865F2)
-            for key, val in prefs.items():
-                embed.add_field(name=key.replace('_', ' ').title(),
-                                value=str(val),
-                                inline=False)
-            await ctx.send(embed=embed)
+@preferences_group.command(name='view',
+                           description="View your current preferences")
+async def preferences_view(interaction: discord.Interaction):
+    """Show the caller's alert preferences"""
+    try:
+        prefs = user_preferences.get(interaction.user.id, {})
+        if not prefs:
+            await interaction.response.send_message(
+                "You have no preferences set. Use `/commands` to see available options.",
+                ephemeral=True)
+            return
 
-        elif action == "set" and setting and value:
-            if user_id not in user_preferences:
-                user_preferences[user_id] = {}
+        embed = discord.Embed(title="Your Preferences", color=0x5865F2)
+        for key, val in prefs.items():
+            embed.add_field(name=key.replace('_', ' ').title(),
+                            value=str(val),
+                            inline=False)
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+    except Exception as e:
+        logger.error("Error in preferences command: %s", e)
+        await interaction.response.send_message(
+            "❌ Error managing preferences.", ephemeral=True)
+
+
+@preferences_group.command(name='set', description="Set an alert preference")
+@app_commands.describe(
+    value="Comma-separated ranks for rank_filter, true/false for red_only")
+@app_commands.choices(setting=[
+    app_commands.Choice(name='rank_filter', value='rank_filter'),
+    app_commands.Choice(name='red_only', value='red_only')
+])
+async def preferences_set(interaction: discord.Interaction,
+                          setting: app_commands.Choice[str], value: str):
+    """Update one of the caller's alert preferences"""
+    try:
+        user_id = interaction.user.id
+        if user_id not in user_preferences:
+            user_preferences[user_id] = {}
+
+        if setting.value == "rank_filter":
+            ranks = [r.strip().upper() for r in value.split(',')]
+            valid_ranks = ['E', 'D', 'C', 'B', 'A', 'S', 'SS']
+            ranks = [r for r in ranks if r in valid_ranks]
+            user_preferences[user_id]['rank_filter'] = ranks
+            await interaction.response.send_message(
+                f"✅ Rank filter set to: {', '.join(ranks)}", ephemeral=True)
 
-            if setting == "rank_filter":
-                ranks = [r.strip().upper() for r in value.split(',')]
-                valid_ranks = ['E', 'D', 'C', 'B', 'A', 'S', 'SS']
-                ranks = [r for r in ranks if r in valid_ranks]
-                user_preferences[user_id]['rank_filter'] = ranks
-                await ctx.send(f"✅ Rank filter set to: {', '.join(ranks)}")
+        elif setting.value == "red_only":
+            user_preferences[user_id]['red_only'] = value.lower() == 'true'
+            await interaction.response.send_message(
+                f"✅ Red-only filter set to: {value.lower() == 'true'}",
+                ephemeral=True)
+    except Exception as e:
+        logger.error("Error in preferences command: %s", e)
+        await interaction.response.send_message(
+            "❌ Error managing preferences.", ephemeral=True)
 
-            elif setting == "red_only":
-                user_preferences[user_id]['red_only'] = value.lower() == 'true'
-                await ctx.send(
-                    f"✅ Red-only filter set to: {value.lower() == 'true'}")
 
-            else:
-                await ctx.send(
-                    "❌ Invalid setting. Use `rank_filter` or `red_only`.")
-        else:
-            await ctx.send(
-                "❌ Usage: `!preferences view` or `!preferences set <setting> <value>`"
-            )
-
-    except Exception as e:
-        logger.error(f"Error in preferences command: {e}")
-        await ctx.send("❌ Error managing preferences.")
+bot.tree.add_command(preferences_group)
 
 
-@bot.command(name="createembed")
-async def create_embed(ctx, channel_id: int, titlet: str, *, content: str):
+@bot.tree.command(name="createembed",
+                  description="Send a custom embed to a channel")
+@app_commands.guild_only()
+async def create_embed(interaction: discord.Interaction,
+                       channel: discord.TextChannel, title: str, content: str):
     try:
-        channel = bot.get_channel(channel_id)
-        if channel is None:
-            await ctx.send("Invalid channel ID.")
-            return
         contentn = f"\n {content}"
-        embed = discord.Embed(title=titlet, color=0x5865F2)
+        embed = discord.Embed(title=title, color=0x5865F2)
         embed.add_field(name="Description", value=contentn, inline=False)
         embed.set_thumbnail(
             url=
@@ -663,78 +969,492 @@ async def create_embed(ctx, channel_id: int, titlet: str, *, content: str):
         embed.set_footer(text="Ascented Guild.")
 
         await channel.send(embed=embed)
-        await ctx.send("Embed sent successfully.")
+        await interaction.response.send_message("Embed sent successfully.",
+                                                ephemeral=True)
     except Exception as e:
-        await ctx.send(f"Error creating embed: {e}")
+        await interaction.response.send_message(
+            f"Error creating embed: {e}", ephemeral=True)
 
 
-@bot.command(name='stats')
-async def stats_command(ctx):
+STATS_WINDOWS = {'all': None, 'lifetime': None, '1h': '1h', '24h': '24h'}
+
+
+@bot.tree.command(name='stats', description="Show dungeon spawn statistics")
+@app_commands.guild_only()
+@app_commands.choices(window=[
+    app_commands.Choice(name=window, value=window)
+    for window in ('all', '1h', '24h')
+])
+async def stats_command(interaction: discord.Interaction, window: str = 'all'):
     """Show dungeon spawn statistics"""
     try:
-        embed = discord.Embed(title="📊 Dungeon Statistics", color=0x5865F2)
+        stats_engine = (await
+                        guild_states.get(interaction.guild_id)).stats_engine
+        summary = stats_engine.summary(STATS_WINDOWS[window])
+        label = "Lifetime" if STATS_WINDOWS[window] is None else f"Last {window}"
+        embed = discord.Embed(title=f"📊 Dungeon Statistics — {label}",
+                              color=0x5865F2)
         embed.add_field(name="Total Spawns",
-                        value=dungeon_stats['total_spawns'],
+                        value=summary['total'],
+                        inline=True)
+        embed.add_field(name="Spawn Rate",
+                        value=f"{summary['rate_per_hour']:.1f}/hour",
                         inline=True)
 
-        if dungeon_stats['rank_counts']:
-            rank_text = '\n'.join([
-                f"{rank}: {count}"
-                for rank, count in sorted(dungeon_stats['rank_counts'].items())
+        if STATS_WINDOWS[window] is None:
+            recent_text = '\n'.join([
+                f"{name}: {recent['total']} ({recent['rate_per_hour']:.1f}/hour)"
+                for name, recent in ((name, stats_engine.summary(name, k=0))
+                                     for name in StatsEngine.WINDOWS)
             ])
+            embed.add_field(name="Recent", value=recent_text, inline=True)
+
+        if summary['ranks']:
+            rank_text = '\n'.join(
+                [f"{rank}: {count}" for rank, count in summary['ranks']])
             embed.add_field(name="Ranks", value=rank_text, inline=True)
 
-        if dungeon_stats['island_counts']:
-            top_islands = sorted(dungeon_stats['island_counts'].items(),
-                                 key=lambda x: x[1],
-                                 reverse=True)[:5]
-            island_text = '\n'.join(
-                [f"{island}: {count}" for island, count in top_islands])
+        if summary['islands']:
+            island_text = '\n'.join([
+                f"{island}: {count}" for island, count in summary['islands']
+            ])
             embed.add_field(name="Top Islands", value=island_text, inline=True)
 
-        await ctx.send(embed=embed)
+        if summary['bosses']:
+            boss_text = '\n'.join(
+                [f"{boss}: {count}" for boss, count in summary['bosses']])
+            embed.add_field(name="Top Bosses", value=boss_text, inline=True)
+
+        await interaction.response.send_message(embed=embed)
+    except Exception as e:
+        logger.error("Error in stats command: %s", e)
+        await interaction.response.send_message(
+            "❌ Error retrieving statistics.", ephemeral=True)
+
+
+def format_duration(seconds):
+    minutes = int(seconds // 60)
+    if minutes < 60:
+        return f"{minutes}m"
+    hours, minutes = divmod(minutes, 60)
+    if hours < 24:
+        return f"{hours}h {minutes}m"
+    days, hours = divmod(hours, 24)
+    return f"{days}d {hours}h"
+
+
+async def forecast_target_autocomplete(interaction: discord.Interaction,
+                                      current: str):
+    ranks = [
+        rank for rank in config.current()['colors']
+        if rank.startswith(current.strip().upper())
+    ]
+    islands = await name_autocomplete('island')(interaction, current)
+    return [app_commands.Choice(name=rank, value=rank)
+            for rank in ranks] + islands[:25 - len(ranks)]
+
+
+@bot.tree.command(name='forecast',
+                  description="Forecast the next spawn for a rank or island")
+@app_commands.guild_only()
+@app_commands.autocomplete(target=forecast_target_autocomplete)
+async def forecast_command(interaction: discord.Interaction,
+                           target: str = None):
+    """Forecast the next spawn for a rank or island"""
+    try:
+        forecaster = (await
+                      guild_states.get(interaction.guild_id)).forecaster
+        settings = config.current().for_guild(interaction.guild_id)
+        if target is None:
+            targets = [('rank', rank)
+                       for rank in settings['forecast']['ranks']]
+        elif target.upper() in settings['colors']:
+            targets = [('rank', target.upper())]
+        else:
+            targets = [('island', target)]
+
+        embed = discord.Embed(title="🔮 Spawn Forecast", color=0x5865F2)
+        for kind, key in targets:
+            result = forecaster.forecast(kind, key)
+            name = f"Rank {key}" if kind == 'rank' else f"🌍 {key}"
+            if result is None:
+                embed.add_field(name=name,
+                                value="Not enough history yet.",
+                                inline=False)
+                continue
+            value = (
+                f"Last seen {format_duration(result['since_last'])} ago\n"
+                f"Typical gap {format_duration(result['median_gap'])} "
+                f"(mean {format_duration(result['mean_gap'])}, {result['samples']} samples)\n"
+            )
+            if result['overdue']:
+                value += ("Overdue: longer than almost every gap seen, "
+                          "so there's no estimate.")
+            else:
+                within_text = ' | '.join([
+                    f"{format_duration(horizon)}: {probability:.0%}"
+                    for horizon, probability in result['within'].items()
+                ])
+                value += (
+                    f"Expected in ~{format_duration(result['expected_in'])}\n"
+                    f"Chance within {within_text}")
+            embed.add_field(name=name, value=value, inline=False)
+
+        await interaction.response.send_message(embed=embed)
     except Exception as e:
-        logger.error(f"Error in stats command: {e}")
-        await ctx.send("❌ Error retrieving statistics.")
+        logger.error("Error in forecast command: %s", e)
+        await interaction.response.send_message(
+            "❌ Error computing forecast.", ephemeral=True)
+
+
+@tasks.loop(minutes=1)
+async def forecast_prealerts():
+    for state in guild_states:
+        await send_forecast_prealerts(state)
 
 
-@bot.command(name='history')
-async def history_command(ctx, count: int = 5):
+async def send_forecast_prealerts(state):
+    try:
+        settings = config.current().for_guild(state.guild_id)
+        forecast_settings = settings['forecast']
+        if not forecast_settings['prealerts']:
+            return
+        due = state.forecaster.due_alerts(
+            forecast_settings['ranks'],
+            forecast_settings['horizon_minutes'] * 60,
+            forecast_settings['probability'])
+        if not due:
+            return
+        ping_channel = bot.get_channel(settings.channel('ping'))
+        if not ping_channel:
+            logger.error("Ping channel not found")
+            return
+        for rank, probability in due:
+            mention_text = format_role_mentions(
+                settings['role_mentions'].get(rank))
+            embed = discord.Embed(
+                title=f"⏳ RANK {rank} DUNGEON LIKELY SOON",
+                description=
+                (f"Based on spawn history there is a {probability:.0%} chance "
+                 f"of a rank {rank} dungeon in the next "
+                 f"{forecast_settings['horizon_minutes']} minutes."),
+                color=get_rank_color(rank))
+            embed.set_footer(text="Ascented Guild.")
+            outbox.send(ping_channel, content=mention_text or None, embed=embed)
+            logger.info("Sent forecast pre-alert for %s rank",
+                        rank,
+                        extra={
+                            'guild': state.guild_id,
+                            'channel': ping_channel.id,
+                            'rank': rank
+                        })
+    except Exception as e:
+        logger.error("Error in forecast pre-alerts: %s", e)
+
+
+def render_history_page(state, filters, page, page_size):
+    dungeon_history = state.history
+    total = dungeon_history.count(filters)
+    pages = max((total + page_size - 1) // page_size, 1)
+    page = min(max(page, 1), pages)
+    key = (tuple(sorted(filters.items())), page, page_size,
+           dungeon_history.version(filters))
+
+    def render():
+        records = dungeon_history.page(filters, page, page_size)
+        title = f"📜 Dungeon History ({total})"
+        if filters:
+            title += " — " + ", ".join(
+                f"{field}: {value}" for field, value in filters.items())
+        embed = discord.Embed(title=title, color=0x5865F2)
+        first = (page - 1) * page_size + 1
+        for i, dungeon in enumerate(records, first):
+            time_str = dungeon['timestamp'].strftime("%d/%m %H:%M:%S")
+            value = f"🌍 {dungeon['island']} | 👹 {dungeon['boss']} | 🏅 {dungeon['rank'].upper()}"
+            embed.add_field(name=f"{i}. {time_str}", value=value, inline=False)
+        embed.set_footer(text=f"Page {page}/{pages}")
+        return embed
+
+    return state.history_pages.get_or_render(key, render), page, pages
+
+
+class HistoryView(View):
+
+    def __init__(self, state, author_id, filters, page, page_size, pages):
+        super().__init__(timeout=180)
+        self.state = state
+        self.author_id = author_id
+        self.filters = filters
+        self.page = page
+        self.page_size = page_size
+        self.update_buttons(pages)
+
+    def update_buttons(self, pages):
+        self.previous_page.disabled = self.page <= 1
+        self.next_page.disabled = self.page >= pages
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        return interaction.user.id == self.author_id
+
+    async def show(self, interaction, page):
+        embed, self.page, pages = render_history_page(
+            self.state, self.filters, page, self.page_size)
+        self.update_buttons(pages)
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.grey)
+    async def previous_page(self, interaction, button):
+        await self.show(interaction, self.page - 1)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.grey)
+    async def next_page(self, interaction, button):
+        await self.show(interaction, self.page + 1)
+
+
+@tasks.loop(seconds=config.current()['watch_seconds'])
+async def config_watcher():
+    try:
+        if config.changed():
+            await asyncio.to_thread(config.reload)
+    except config.ConfigError as e:
+        logger.error("Config reload failed, keeping previous config: %s", e)
+    except Exception as e:
+        logger.error("Error in config watcher: %s", e)
+
+
+@tasks.loop(minutes=5)
+async def evict_idle_guilds():
+    try:
+        await guild_states.evict_idle(
+            config.current()['guild_idle_minutes'] * 60)
+    except Exception as e:
+        logger.error("Error evicting idle guilds: %s", e)
+
+
+@tasks.loop(seconds=30)
+async def flush_violations():
+    try:
+        await automod.flush_violations()
+    except Exception as e:
+        logger.error("Error writing violation log: %s", e)
+
+
+def snapshot_path():
+    return config.state_path(config.current()['shutdown']['snapshot_file'])
+
+
+async def save_snapshot():
+    """Write every loaded guild, preferences and offender scores to disk"""
+    async with snapshot_lock:
+        captured = snapshot.capture(guild_states, user_preferences,
+                                    automod.offenders)
+        size = await asyncio.to_thread(snapshot.write, snapshot_path(),
+                                       captured)
+    logger.info("Wrote state snapshot: %s guilds, %s bytes",
+                len(captured['guilds']), size)
+
+
+def restore_snapshot():
+    """Load the last snapshot, if any, before connecting"""
+    path = snapshot_path()
+    if not os.path.exists(path):
+        return
+    try:
+        started = time.perf_counter()
+        data = snapshot.read(path)
+        rows = snapshot.restore(data, guild_states, user_preferences,
+                                automod.offenders)
+        logger.info("Restored %s guilds (%s spawns) from snapshot in %.1f ms",
+                    len(data['guilds']), rows,
+                    (time.perf_counter() - started) * 1000)
+    except Exception as e:
+        logger.error("Error restoring state snapshot: %s", e)
+
+
+@tasks.loop(minutes=config.current()['shutdown']['snapshot_minutes'])
+async def snapshot_state():
+    try:
+        await save_snapshot()
+    except Exception as e:
+        logger.error("Error writing state snapshot: %s", e)
+
+
+@bot_lifecycle.on_shutdown
+async def stop_background_tasks():
+    for loop in (forecast_prealerts, config_watcher, evict_idle_guilds,
+                 flush_violations):
+        loop.cancel()
+    # Cancelling would abandon a write mid-thread; stop lets it finish and
+    # the shutdown snapshot queues behind it on snapshot_lock.
+    snapshot_state.stop()
+
+
+@bot_lifecycle.on_shutdown
+async def drain_outbox():
+    await outbox.drain(config.current()['shutdown']['drain_seconds'])
+
+
+@bot_lifecycle.on_shutdown
+async def flush_violations_on_shutdown():
+    await automod.flush_violations()
+
+
+@bot_lifecycle.on_shutdown
+async def snapshot_on_shutdown():
+    await save_snapshot()
+
+
+@bot_lifecycle.on_shutdown
+async def close_bot():
+    await bot.close()
+
+
+@bot.tree.command(name='reloadconfig',
+                  description="Reload config.json and the automod word list")
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def reload_config_command(interaction: discord.Interaction):
+    """Reload config.json and the automod word list"""
+    try:
+        snapshot = await asyncio.to_thread(config.reload)
+        await interaction.response.send_message(
+            f"✅ Config reloaded: {snapshot.word_count} blocked words compiled in {snapshot.compile_ms:.2f} ms.",
+            ephemeral=True)
+    except config.ConfigError as e:
+        await interaction.response.send_message(
+            f"❌ Reload failed, keeping previous config: {e}", ephemeral=True)
+    except Exception as e:
+        logger.error("Error in reloadconfig command: %s", e)
+        await interaction.response.send_message("❌ Error reloading config.",
+                                                ephemeral=True)
+
+
+@bot.tree.command(name='history', description="Show recent dungeon history")
+@app_commands.guild_only()
+@app_commands.describe(count="Spawns per page (1-10)")
+@app_commands.choices(rank=[
+    app_commands.Choice(name=rank, value=rank)
+    for rank in ('E', 'D', 'C', 'B', 'A', 'S', 'SS')
+])
+@app_commands.autocomplete(island=name_autocomplete('island'),
+                           boss=name_autocomplete('boss'))
+async def history_command(interaction: discord.Interaction,
+                          count: app_commands.Range[int, 1, 10] = 5,
+                          rank: str = None,
+                          island: str = None,
+                          boss: str = None):
     """Show recent dungeon history"""
     try:
+        state = await guild_states.get(interaction.guild_id)
+        dungeon_history = state.history
         if not dungeon_history:
-            await ctx.send("No dungeon history available.")
+            await interaction.response.send_message(
+                "No dungeon history available.")
             return
 
-        count = min(count, 10)  # Limit to 10
-        recent_dungeons = dungeon_history[-count:]
+        filters = {
+            field: value
+            for field, value in (('rank', rank), ('island', island),
+                                 ('boss', boss)) if value
+        }
+        if not dungeon_history.count(filters):
+            await interaction.response.send_message(
+                "No dungeon history matches those filters.")
+            return
 
-        embed = discord.Embed(
-            title=f"📜 Recent Dungeon History ({len(recent_dungeons)})",
-            color=0x5865F2)
+        embed, page, pages = render_history_page(state, filters, 1, count)
+        view = HistoryView(state, interaction.user.id, filters, page, count,
+                           pages)
+        await interaction.response.send_message(embed=embed, view=view)
+    except Exception as e:
+        logger.error("Error in history command: %s", e)
+        await interaction.response.send_message(
+            "❌ Error retrieving history.", ephemeral=True)
+
+
+@bot.tree.command(name='exporthistory',
+                  description="Export dungeon history as a .npz archive")
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def export_history_command(interaction: discord.Interaction):
+    """Export dungeon history as a columnar .npz archive"""
+    try:
+        dungeon_history = (await guild_states.get(interaction.guild_id)).history
+        if not dungeon_history:
+            await interaction.response.send_message(
+                "No dungeon history available.")
+            return
+        await interaction.response.defer()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(
+                tmpdir,
+                f"dungeon_history_{datetime.now():%Y%m%d_%H%M%S}.npz")
+            # Export a copy taken on the loop; live spawns keep appending.
+            rows = await asyncio.to_thread(archive.export_history,
+                                           list(dungeon_history), path)
+            await interaction.followup.send(
+                f"✅ Exported {rows} dungeon spawns.", file=discord.File(path))
+    except archive.ArchiveError as e:
+        await send_error(interaction, f"❌ {e}")
+    except Exception as e:
+        logger.error("Error exporting history: %s", e)
+        await send_error(interaction, "❌ Error exporting history.")
+
+
+@bot.tree.command(name='importhistory',
+                  description="Import dungeon history from a .npz archive")
+@app_commands.guild_only()
+@app_commands.default_permissions(administrator=True)
+@app_commands.checks.has_permissions(administrator=True)
+async def import_history_command(interaction: discord.Interaction,
+                                 file: discord.Attachment):
+    """Import dungeon history from an attached .npz archive"""
+    try:
+        await interaction.response.defer()
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, "import.npz")
+            await file.save(path)
+            state = await guild_states.get(interaction.guild_id)
+            # Decode off the loop, but only mutate the live state on it.
+            batch = await asyncio.to_thread(archive.decode_history, path,
+                                            list(state.history))
+        rows = archive.apply_import(batch, state) if batch else 0
+        await interaction.followup.send(f"✅ Imported {rows} dungeon spawns.")
+    except archive.ArchiveError as e:
+        await send_error(interaction, f"❌ {e}")
+    except Exception as e:
+        logger.error("Error importing history: %s", e)
+        await send_error(interaction, "❌ Error importing history.")
 
-        for i, dungeon in enumerate(reversed(recent_dungeons), 1):
-            time_str = dungeon['timestamp'].strftime("%H:%M:%S")
-            value = f"🌍 {dungeon['island']} | 👹 {dungeon['boss']} | 🏅 {dungeon['rank'].upper()}"
-            embed.add_field(name=f"{i}. {time_str}", value=value, inline=False)
 
-        await ctx.send(embed=embed)
-    except Exception as e:
-        logger.error(f"Error in history command: {e}")
-        await ctx.send("❌ Error retrieving history.")
+async def send_error(interaction, text):
+    if interaction.response.is_done():
+        await interaction.followup.send(text, ephemeral=True)
+    else:
+        await interaction.response.send_message(text, ephemeral=True)
 
 
-@bot.event
-async def on_command_error(ctx, error):
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error):
     """Global error handler"""
-    if isinstance(error, commands.CommandNotFound):
-        await ctx.send(
-            "❌ Command not found. Use `!commands` to see available commands.")
-    elif isinstance(error, commands.MissingRequiredArgument):
-        await ctx.send(f"❌ Missing required argument: {error.param}")
+    if isinstance(error, app_commands.MissingPermissions):
+        await send_error(interaction,
+                         "❌ You don't have permission to use this command.")
+    elif isinstance(error, app_commands.NoPrivateMessage):
+        await send_error(interaction,
+                         "❌ This command can only be used in a server.")
     else:
-        logger.error(f"Command error: {error}")
-        await ctx.send("❌ An error occurred while processing your command.")
+        logger.error("Command error: %s", error)
+        await send_error(interaction,
+                         "❌ An error occurred while processing your command.")
+
+
+async def main():
+    restore_snapshot()
+    async with bot:
+        bot_lifecycle.install()
+        await bot.start(TOKEN)
 
 
-bot.run(TOKEN)
+asyncio.run(main())
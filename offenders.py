@@ -0,0 +1,104 @@
+import json
+import os
+import time
+from collections import OrderedDict
+
+
+class OffenderTracker:
+    """Decaying per-user violation scores in a bounded LRU with TTL.
+
+    Scores halve every `half_life` seconds. Each escalation level fires
+    once as the score climbs past it and re-arms once the score decays
+    below half of it. Violations are buffered and appended to a JSON-lines
+    file in batches.
+    """
+
+    def __init__(self, max_entries=10000, ttl=86400, log_path=None,
+                 batch_size=50):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.log_path = log_path
+        self.batch_size = batch_size
+        # (guild_id, user_id) -> [score, updated_at, level]
+        self.entries = OrderedDict()
+        self.pending = []
+
+    def _decayed(self, entry, now, half_life):
+        score, updated_at, level = entry
+        if now - updated_at > self.ttl:
+            return 0.0
+        return score * 0.5**((now - updated_at) / half_life)
+
+    def score(self, key, half_life, now=None):
+        entry = self.entries.get(key)
+        if entry is None:
+            return 0.0
+        return self._decayed(entry, time.time() if now is None else now,
+                             half_life)
+
+    def record(self, key, levels, half_life, weight=1.0, reason=None,
+               now=None):
+        """Add a violation and return the newly reached level, if any.
+
+        `levels` is a list of ``(name, threshold)`` in ascending order.
+        """
+        now = time.time() if now is None else now
+        entry = self.entries.get(key)
+        if entry is None:
+            entry = self.entries[key] = [0.0, now, 0]
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        score = self._decayed(entry, now, half_life) + weight
+        reached = sum(1 for _, threshold in levels if score >= threshold)
+        # Levels the score has decayed well below can fire again.
+        armed = min(entry[2], sum(1 for _, threshold in levels
+                                  if score - weight >= threshold / 2))
+        entry[0], entry[1], entry[2] = score, now, max(armed, reached)
+
+        self.pending.append({
+            'time': now,
+            'guild_id': key[0],
+            'user_id': key[1],
+            'score': round(score, 3),
+            'reason': reason,
+        })
+        if reached > armed:
+            return levels[reached - 1][0]
+        return None
+
+    def snapshot(self):
+        """Plain-data copy of the scores; pending violations are flushed
+        separately so a restore never logs them twice."""
+        return {
+            'entries': [(key, list(entry))
+                        for key, entry in self.entries.items()],
+        }
+
+    def restore(self, data, now=None):
+        now = time.time() if now is None else now
+        for key, entry in data['entries']:
+            if now - entry[1] <= self.ttl:
+                self.entries[key] = entry
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def should_flush(self):
+        return len(self.pending) >= self.batch_size
+
+    def take_pending(self):
+        """Detach the buffered violations; call on the event loop."""
+        batch, self.pending = self.pending, []
+        return batch
+
+    def write(self, batch):
+        """Append a detached batch to the log file; safe off-loop."""
+        if not batch or not self.log_path:
+            return 0
+        directory = os.path.dirname(self.log_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(self.log_path, 'a', encoding='utf-8') as fh:
+            fh.writelines(json.dumps(record) + '\n' for record in batch)
+        return len(batch)
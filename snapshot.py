@@ -0,0 +1,157 @@
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+import time
+
+import archive
+from guilds import GuildState
+
+# Layout: MAGIC, a little-endian u64 buffer count, then one (offset, length)
+# u64 pair per buffer, the pickle itself and the 64-byte aligned buffers.
+# Arrays are pickled out-of-band (protocol 5), so `read` returns them as
+# views into the memory-mapped file and `restore` decodes history straight
+# from those views. The records themselves are rebuilt as Python objects;
+# nothing keeps the map alive once restore returns.
+MAGIC = b'ASCSNAP1'
+_COUNT = struct.Struct('<Q')
+_EXTENT = struct.Struct('<QQ')
+_ALIGN = 64
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def capture(registry, user_preferences, offenders):
+    """Copy the bot's in-memory state; call on the event loop.
+
+    History is copied by reference only; encoding happens in `write`.
+    """
+    return {
+        'saved_at': time.time(),
+        'guilds': {
+            state.guild_id: {
+                'history': list(state.history),
+                'tickets': state.tickets.snapshot(),
+                'recent_spawns': state.recent_spawns_wall(),
+            }
+            for state in registry
+        },
+        'user_preferences': {
+            user_id: dict(prefs)
+            for user_id, prefs in user_preferences.items()
+        },
+        'offenders': offenders.snapshot(),
+    }
+
+
+def _pad(length):
+    return -length % _ALIGN
+
+
+def write(path, captured):
+    """Encode `captured` and atomically replace the snapshot at `path`."""
+    for guild in captured['guilds'].values():
+        records = guild['history']
+        guild['history'] = (archive.encode_history(records)
+                            if records and archive.np is not None else None)
+
+    buffers = []
+    payload = pickle.dumps(captured,
+                           protocol=5,
+                           buffer_callback=buffers.append)
+    views = [buffer.raw() for buffer in buffers]
+    header = len(MAGIC) + _COUNT.size + _EXTENT.size * len(views)
+    offset = header + len(payload)
+    extents = []
+    for view in views:
+        offset += _pad(offset)
+        extents.append((offset, view.nbytes))
+        offset += view.nbytes
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    # A unique temp file, so an overlapping write can't interleave with it.
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.',
+                                    prefix=os.path.basename(path) + '.',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(MAGIC)
+            fh.write(_COUNT.pack(len(views)))
+            for extent in extents:
+                fh.write(_EXTENT.pack(*extent))
+            fh.write(payload)
+            for (start, _), view in zip(extents, views):
+                fh.write(b'\0' * (start - fh.tell()))
+                fh.write(view)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    if directory and hasattr(os, 'O_DIRECTORY'):
+        fd = os.open(directory, os.O_DIRECTORY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+    return offset
+
+
+def read(path):
+    """Map a snapshot file and unpickle it; arrays are views into the map.
+
+    The mapping is released once the returned arrays are dropped.
+    """
+    with open(path, 'rb') as fh:
+        try:
+            mapped = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            raise SnapshotError("Snapshot file is empty.")
+    view = memoryview(mapped)
+    if bytes(view[:len(MAGIC)]) != MAGIC:
+        raise SnapshotError("Not a state snapshot (bad header).")
+    position = len(MAGIC)
+    (count, ) = _COUNT.unpack_from(view, position)
+    position += _COUNT.size
+    extents = [
+        _EXTENT.unpack_from(view, position + i * _EXTENT.size)
+        for i in range(count)
+    ]
+    position += _EXTENT.size * count
+    end = extents[0][0] if extents else len(view)
+    try:
+        return pickle.loads(view[position:end],
+                            buffers=[
+                                view[start:start + length]
+                                for start, length in extents
+                            ])
+    except Exception as e:
+        raise SnapshotError(f"Corrupt snapshot: {e}")
+
+
+def restore(data, registry, user_preferences, offenders):
+    """Rebuild guild states and module state from `read` output.
+
+    Returns the number of history rows restored.
+    """
+    rows = 0
+    for guild_id, guild in data['guilds'].items():
+        state = GuildState(guild_id)
+        if guild['history'] is not None and archive.np is not None:
+            columns, dictionaries = guild['history']
+            rows += archive.import_columns(columns, dictionaries, state)
+        state.tickets.restore(guild['tickets'])
+        state.restore_recent_spawns(guild['recent_spawns'])
+        registry.states[guild_id] = state
+    user_preferences.update(data['user_preferences'])
+    offenders.restore(data['offenders'])
+    return rows
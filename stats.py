@@ -0,0 +1,266 @@
+import time
+
+# Dimensions tracked for every recorded spawn.
+DIMENSIONS = ('rank', 'island', 'boss')
+# There are only seven ranks, so they are always reported in full.
+RANK_COUNT = 7
+
+
+class _Bucket:
+    __slots__ = ('count', 'keys', 'prev', 'next')
+
+    def __init__(self, count):
+        self.count = count
+        self.keys = {}
+        self.prev = None
+        self.next = None
+
+
+class Leaderboard:
+    """Counter that keeps its keys ordered by count.
+
+    Keys live in buckets of equal count chained from highest to lowest, so
+    increments and decrements only move a key between neighbouring buckets
+    and ``top(k)`` walks at most ``k`` keys without sorting.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self._node = {}
+        self._head = None
+        self._tail = None
+
+    def __len__(self):
+        return len(self.counts)
+
+    def get(self, key, default=0):
+        return self.counts.get(key, default)
+
+    def _link_after(self, bucket, prev):
+        # Insert bucket below `prev`; prev=None means new head.
+        bucket.prev = prev
+        bucket.next = prev.next if prev else self._head
+        if bucket.next:
+            bucket.next.prev = bucket
+        else:
+            self._tail = bucket
+        if prev:
+            prev.next = bucket
+        else:
+            self._head = bucket
+
+    def _unlink(self, bucket):
+        if bucket.prev:
+            bucket.prev.next = bucket.next
+        else:
+            self._head = bucket.next
+        if bucket.next:
+            bucket.next.prev = bucket.prev
+        else:
+            self._tail = bucket.prev
+
+    def _place(self, key, count, start, upward):
+        """Put key into the bucket for `count`, searching from `start`."""
+        cursor = start
+        if upward:
+            while cursor and cursor.count < count:
+                cursor = cursor.prev
+            # cursor is now the first bucket (going up) with count >= target
+            if cursor and cursor.count == count:
+                bucket = cursor
+            else:
+                bucket = _Bucket(count)
+                self._link_after(bucket, cursor)
+        else:
+            prev = cursor.prev if cursor else self._tail
+            while cursor and cursor.count > count:
+                prev = cursor
+                cursor = cursor.next
+            if cursor and cursor.count == count:
+                bucket = cursor
+            else:
+                bucket = _Bucket(count)
+                self._link_after(bucket, prev)
+        bucket.keys[key] = None
+        self._node[key] = bucket
+
+    def add(self, key, amount=1):
+        if amount <= 0:
+            return self.remove(key, -amount) if amount else None
+        old = self._node.get(key)
+        new_count = self.counts.get(key, 0) + amount
+        self.counts[key] = new_count
+        if old is None:
+            start = self._tail
+        else:
+            del old.keys[key]
+            start = old
+        self._place(key, new_count, start, upward=True)
+        if old is not None and not old.keys:
+            self._unlink(old)
+
+    def remove(self, key, amount=1):
+        old = self._node.get(key)
+        if old is None or amount <= 0:
+            return
+        new_count = self.counts[key] - amount
+        del old.keys[key]
+        if new_count > 0:
+            self.counts[key] = new_count
+            self._place(key, new_count, old, upward=False)
+        else:
+            del self.counts[key]
+            del self._node[key]
+        if not old.keys:
+            self._unlink(old)
+
+    def top(self, k):
+        result = []
+        bucket = self._head
+        while bucket and len(result) < k:
+            for key in bucket.keys:
+                result.append((key, bucket.count))
+                if len(result) == k:
+                    break
+            bucket = bucket.next
+        return result
+
+
+class _Window:
+    """Ring of fixed-width time slots with running window totals."""
+
+    def __init__(self, slot_seconds, slots):
+        self.slot_seconds = slot_seconds
+        self.slots = slots
+        self.ring = [None] * slots
+        self.total = 0
+        self.boards = {dim: Leaderboard() for dim in DIMENSIONS}
+        self._current = None
+
+    def _expire(self, slot):
+        self.total -= slot['total']
+        for dim, counts in slot['counts'].items():
+            board = self.boards[dim]
+            for key, count in counts.items():
+                board.remove(key, count)
+
+    def advance(self, now):
+        index = int(now // self.slot_seconds)
+        if self._current is not None and index <= self._current:
+            return
+        start = index - self.slots + 1
+        if self._current is not None:
+            start = max(start, self._current + 1)
+        for i in range(start, index + 1):
+            pos = i % self.slots
+            slot = self.ring[pos]
+            if slot is not None and slot['index'] != i:
+                self._expire(slot)
+                self.ring[pos] = None
+        self._current = index
+
+    def add(self, values, now):
+        self.advance(now)
+        index = int(now // self.slot_seconds)
+        if index <= self._current - self.slots:
+            return  # older than the window
+        pos = index % self.slots
+        slot = self.ring[pos]
+        if slot is None:
+            slot = {
+                'index': index,
+                'total': 0,
+                'counts': {dim: {} for dim in DIMENSIONS}
+            }
+            self.ring[pos] = slot
+        slot['total'] += 1
+        self.total += 1
+        for dim, key in values.items():
+            slot['counts'][dim][key] = slot['counts'][dim].get(key, 0) + 1
+            self.boards[dim].add(key)
+
+
+class StatsEngine:
+    """Lifetime and rolling-window spawn statistics.
+
+    The 1h window is kept in per-minute slots and the 24h window in
+    per-hour slots, so window figures are accurate to one slot width.
+    """
+
+    WINDOWS = {
+        '1h': (60, 60),
+        '24h': (3600, 24),
+    }
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        self.started_at = clock()
+        self.total = 0
+        self.boards = {dim: Leaderboard() for dim in DIMENSIONS}
+        self.windows = {
+            name: _Window(slot_seconds, slots)
+            for name, (slot_seconds, slots) in self.WINDOWS.items()
+        }
+
+    @staticmethod
+    def _values(dungeon_info):
+        return {
+            'rank': dungeon_info['rank'].upper(),
+            'island': dungeon_info['island'],
+            'boss': dungeon_info['boss'],
+        }
+
+    def record(self, dungeon_info, timestamp=None):
+        now = self.clock()
+        timestamp = now if timestamp is None else timestamp
+        values = self._values(dungeon_info)
+        self.total += 1
+        for dim, key in values.items():
+            self.boards[dim].add(key)
+        for window in self.windows.values():
+            window.advance(now)
+            window.add(values, timestamp)
+
+    def merge(self, total, counts, earliest=None, recent=()):
+        """Fold in precomputed lifetime counts from a bulk import.
+
+        ``counts`` maps each dimension to ``{key: count}``; ``recent`` holds
+        ``(dungeon_info, timestamp)`` pairs young enough for the windows.
+        """
+        self.total += total
+        for dim, dim_counts in counts.items():
+            board = self.boards[dim]
+            for key, count in dim_counts.items():
+                board.add(key, count)
+        if earliest is not None:
+            self.started_at = min(self.started_at, earliest)
+        now = self.clock()
+        for dungeon_info, timestamp in recent:
+            values = self._values(dungeon_info)
+            for window in self.windows.values():
+                window.advance(now)
+                window.add(values, timestamp)
+
+    def summary(self, window=None, k=5):
+        """Return totals, spawn rate and top-k per dimension for a window.
+
+        ``window`` is ``None`` for lifetime or one of ``WINDOWS``.
+        """
+        now = self.clock()
+        if window is None:
+            total = self.total
+            boards = self.boards
+            hours = max((now - self.started_at) / 3600, 1 / 60)
+        else:
+            win = self.windows[window]
+            win.advance(now)
+            total = win.total
+            boards = win.boards
+            hours = win.slot_seconds * win.slots / 3600
+        return {
+            'total': total,
+            'rate_per_hour': total / hours,
+            'ranks': boards['rank'].top(RANK_COUNT),
+            'islands': boards['island'].top(k),
+            'bosses': boards['boss'].top(k),
+        }
@@ -0,0 +1,209 @@
+import heapq
+import time
+
+# Panel button -> ticket type
+TICKET_TYPES = {
+    'open_ticket_guild': 'guild',
+    'open_ticket_support': 'support',
+    'open_ticket_theoro': 'therapy',
+}
+
+
+class RunningMedian:
+    """Median of a growing sample via a max-heap/min-heap pair."""
+
+    def __init__(self):
+        self.low = []  # max-heap of the smaller half, negated
+        self.high = []  # min-heap of the larger half
+
+    def __len__(self):
+        return len(self.low) + len(self.high)
+
+    def add(self, value):
+        if self.low and value > -self.low[0]:
+            heapq.heappush(self.high, value)
+        else:
+            heapq.heappush(self.low, -value)
+        # Keep len(low) == len(high) or len(high) + 1.
+        if len(self.low) > len(self.high) + 1:
+            heapq.heappush(self.high, -heapq.heappop(self.low))
+        elif len(self.high) > len(self.low):
+            heapq.heappush(self.low, -heapq.heappop(self.high))
+
+    def median(self):
+        if not self.low:
+            return None
+        if len(self.low) > len(self.high):
+            return float(-self.low[0])
+        return (-self.low[0] + self.high[0]) / 2
+
+
+class TicketTracker:
+    """Open tickets indexed by type and assignee, with load balancing.
+
+    Staff loads live in a min-heap of ``(load, staff_id, version)``. A load
+    change pushes a fresh entry and bumps the version, so outdated entries
+    are skipped when popped instead of being searched for and removed.
+    """
+
+    def __init__(self, clock=time.time):
+        self.clock = clock
+        # channel_id -> {'type', 'opener_id', 'staff_id', 'opened_at',
+        #                'responded_at'}
+        self.open = {}
+        self.by_type = {}
+        self.by_staff = {}
+        self.loads = {}
+        self._versions = {}
+        self._heap = []
+        self.response_times = RunningMedian()
+        self.type_response_times = {}
+        self.opened_total = 0
+        self.closed_total = 0
+
+    def _set_load(self, staff_id, load):
+        self.loads[staff_id] = load
+        version = self._versions.get(staff_id, 0) + 1
+        self._versions[staff_id] = version
+        heapq.heappush(self._heap, (load, staff_id, version))
+        if len(self._heap) > 2 * len(self.loads) + 32:
+            self._heap = [(load, staff_id, self._versions[staff_id])
+                          for staff_id, load in self.loads.items()]
+            heapq.heapify(self._heap)
+
+    def pick_staff(self, candidates):
+        """Least-loaded staff member among `candidates`, or None."""
+        candidates = set(candidates)
+        for staff_id in candidates:
+            if staff_id not in self.loads:
+                self._set_load(staff_id, 0)
+        chosen = None
+        skipped = []
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            load, staff_id, version = entry
+            if version != self._versions.get(staff_id):
+                continue  # outdated load
+            if staff_id in candidates:
+                chosen = entry
+                break
+            skipped.append(entry)  # offline or not on this ticket's team
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        if chosen is None:
+            return None
+        heapq.heappush(self._heap, chosen)
+        return chosen[1]
+
+    def open_ticket(self, channel_id, ticket_type, opener_id,
+                    candidates=(), now=None):
+        """Index a new ticket and return the assigned staff id, if any."""
+        staff_id = self.pick_staff(candidates)
+        self.open[channel_id] = {
+            'type': ticket_type,
+            'opener_id': opener_id,
+            'staff_id': staff_id,
+            'opened_at': self.clock() if now is None else now,
+            'responded_at': None,
+        }
+        self.by_type.setdefault(ticket_type, set()).add(channel_id)
+        if staff_id is not None:
+            self.by_staff.setdefault(staff_id, set()).add(channel_id)
+            self._set_load(staff_id, self.loads[staff_id] + 1)
+        self.opened_total += 1
+        return staff_id
+
+    def respond(self, channel_id, now=None):
+        """Record the first staff reply; returns the wait in seconds."""
+        ticket = self.open.get(channel_id)
+        if ticket is None or ticket['responded_at'] is not None:
+            return None
+        now = self.clock() if now is None else now
+        ticket['responded_at'] = now
+        wait = max(now - ticket['opened_at'], 0.0)
+        self.response_times.add(wait)
+        self.type_response_times.setdefault(ticket['type'],
+                                            RunningMedian()).add(wait)
+        return wait
+
+    def close_ticket(self, channel_id):
+        ticket = self.open.pop(channel_id, None)
+        if ticket is None:
+            return None
+        self.by_type[ticket['type']].discard(channel_id)
+        staff_id = ticket['staff_id']
+        if staff_id is not None:
+            self.by_staff[staff_id].discard(channel_id)
+            self._set_load(staff_id, max(self.loads[staff_id] - 1, 0))
+        self.closed_total += 1
+        return ticket
+
+    def snapshot(self):
+        """Plain-data copy of the tracker for state snapshots."""
+        return {
+            'open': {
+                channel_id: dict(ticket)
+                for channel_id, ticket in self.open.items()
+            },
+            'response_times': (list(self.response_times.low),
+                               list(self.response_times.high)),
+            'type_response_times': {
+                ticket_type: (list(median.low), list(median.high))
+                for ticket_type, median in self.type_response_times.items()
+            },
+            'opened_total': self.opened_total,
+            'closed_total': self.closed_total,
+        }
+
+    def restore(self, data):
+        """Load a `snapshot`; the indexes and loads are rebuilt from it."""
+        for channel_id, ticket in data['open'].items():
+            self.open[channel_id] = ticket
+            self.by_type.setdefault(ticket['type'], set()).add(channel_id)
+            if ticket['staff_id'] is not None:
+                self.by_staff.setdefault(ticket['staff_id'],
+                                         set()).add(channel_id)
+        for staff_id, channels in self.by_staff.items():
+            self._set_load(staff_id, len(channels))
+
+        def median_from(heaps):
+            # The stored lists are already valid heaps.
+            median = RunningMedian()
+            median.low, median.high = list(heaps[0]), list(heaps[1])
+            return median
+
+        self.response_times = median_from(data['response_times'])
+        self.type_response_times = {
+            ticket_type: median_from(heaps)
+            for ticket_type, heaps in data['type_response_times'].items()
+        }
+        self.opened_total = data['opened_total']
+        self.closed_total = data['closed_total']
+
+    def summary(self, now=None):
+        now = self.clock() if now is None else now
+        waiting = [
+            now - ticket['opened_at'] for ticket in self.open.values()
+            if ticket['responded_at'] is None
+        ]
+        return {
+            'open': len(self.open),
+            'opened_total': self.opened_total,
+            'closed_total': self.closed_total,
+            'by_type': {
+                ticket_type: len(channels)
+                for ticket_type, channels in self.by_type.items() if channels
+            },
+            'by_staff': sorted(((staff_id, len(channels))
+                                for staff_id, channels in self.by_staff.items()
+                                if channels),
+                               key=lambda item: -item[1]),
+            'unanswered': len(waiting),
+            'longest_wait': max(waiting, default=None),
+            'median_response': self.response_times.median(),
+            'responses': len(self.response_times),
+            'type_median_response': {
+                ticket_type: median.median()
+                for ticket_type, median in self.type_response_times.items()
+            },
+        }
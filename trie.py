@@ -0,0 +1,62 @@
+class _Node:
+    __slots__ = ('children', 'top')
+
+    def __init__(self):
+        self.children = {}
+        self.top = []  # [(count, key)] best first, at most `limit` long
+
+
+class PrefixTrie:
+    """Case-insensitive prefix trie with cached top completions per node.
+
+    Every node keeps the `limit` most frequent names below it, so a lookup
+    costs O(len(prefix)) and never walks the subtree.
+    """
+
+    def __init__(self, limit=25):
+        self.limit = limit
+        self.root = _Node()
+        self.counts = {}
+        self.display = {}
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, name, count=1):
+        key = name.strip().lower()
+        if not key or count <= 0:
+            return
+        self.display.setdefault(key, name.strip())
+        total = self.counts.get(key, 0) + count
+        self.counts[key] = total
+        node = self.root
+        self._rank(node, key, total)
+        for char in key:
+            node = node.children.setdefault(char, _Node())
+            self._rank(node, key, total)
+
+    def _rank(self, node, key, total):
+        top = node.top
+        for i, (_, existing) in enumerate(top):
+            if existing == key:
+                del top[i]
+                break
+        else:
+            if len(top) >= self.limit and top[-1][0] >= total:
+                return
+        # Lists are tiny, so an insertion scan beats a heap here.
+        position = len(top)
+        while position and top[position - 1][0] < total:
+            position -= 1
+        top.insert(position, (total, key))
+        del top[self.limit:]
+
+    def complete(self, prefix, limit=None):
+        node = self.root
+        for char in prefix.strip().lower():
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [
+            self.display[key] for _, key in node.top[:limit or self.limit]
+        ]